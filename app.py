@@ -1,6 +1,11 @@
+import uuid
 import streamlit as st
-from jinja2 import Environment, FileSystemLoader
-from backend import generate_cv, parse_cv_to_json
+from backend import get_cached_armory
+from batch import split_job_descriptions
+from instrumentation import RECENT_TRACES
+from jobs import get_job_queue
+from relevance import RelevanceIndex
+from render_cache import canonical_hash
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -13,9 +18,288 @@ st.set_page_config(
 if 'app_state' not in st.session_state:
     st.session_state.app_state = {"armory": {}, "armory_built": False, "api_key": None}
 
-# --- Load Jinja2 Template (still needed for PDF generation) ---
-env = Environment(loader=FileSystemLoader('.'))
-template = env.get_template('template.html')
+
+def render_stream_preview(placeholder, armory):
+    """Shows the sections of a streamed armory that have arrived so far."""
+    with placeholder.container(border=True):
+        if armory.get('candidate_name'): st.markdown(f"**{armory['candidate_name']}**")
+        if armory.get('summary_text'): st.markdown(f"*{armory['summary_text']}*")
+        for competency in armory.get('competencies') or []:
+            st.markdown(f"- **{competency.get('title', '')}**")
+        for job in armory.get('professional_history') or []:
+            st.markdown(f"- {job.get('role', '')} — {job.get('company', '')}")
+        for category in armory.get('awards_leadership') or {}:
+            st.markdown(f"- 🏆 {category}")
+
+
+# --- BACKGROUND JOBS ---
+# Parse, forge and render calls run on the shared job queue; the script thread only submits and polls
+JOB_POLL_SECONDS = 1.0
+
+
+def submit_job(kind, meta=None, **payload):
+    """Queues a job for this session and reruns the page so its status panel starts polling."""
+    user = st.session_state.app_state.setdefault('user_id', uuid.uuid4().hex)
+    job_id = get_job_queue().submit(user, kind, **payload)
+    st.session_state.app_state.setdefault('jobs', {})[kind] = dict(meta or {}, id=job_id)
+    st.rerun()
+
+
+def has_job(kind):
+    return kind in st.session_state.app_state.get('jobs', {})
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_status_panel(kind, label, on_done, preview=None):
+    """
+    Polls one background job. Only rendered while the job is tracked, so the timer stops once a
+    finished job is handed to on_done(result, meta) and the page reruns without it.
+    preview(partial) shows progress; by default a streamed armory is previewed section by section.
+    """
+    jobs = st.session_state.app_state.get('jobs', {})
+    meta = jobs.get(kind)
+    if meta is None: return
+    job = get_job_queue().get(meta['id'])
+    if job is None or job['status'] == "cancelled":
+        jobs.pop(kind, None)
+        st.rerun()
+    if job['status'] == "done":
+        jobs.pop(kind, None)
+        on_done(job['result'], meta)
+        st.rerun()
+    if job['status'] == "failed":
+        st.error(f"{label} Failed: {job['error']}")
+        if st.button("Dismiss", key=f"dismiss_{kind}"):
+            jobs.pop(kind, None)
+            st.rerun()
+        return
+
+    waiting = "Waiting for a free slot..." if job['status'] == "queued" else "Working..."
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        st.info(f"⏳ {label}: {waiting}")
+    with c2:
+        if st.button("Cancel", key=f"cancel_{kind}", use_container_width=True, disabled=job['cancel_requested']):
+            get_job_queue().cancel(meta['id'])
+            st.rerun(scope="fragment")
+    if job['partial'] is None: return
+    if preview:
+        preview(job['partial'])
+    elif isinstance(job['partial'], dict):
+        # Streaming jobs publish each section as it arrives
+        render_stream_preview(st.empty(), job['partial'])
+
+
+def reset_award_widgets():
+    """
+    Award widgets are keyed by category name, so a replaced awards dict that reuses a name would
+    otherwise show (and write back) the old text. Dropping their state makes them take the new values.
+    """
+    for key in [key for key in st.session_state if isinstance(key, str) and key.startswith("award_")]:
+        del st.session_state[key]
+
+
+def reforge_into_editor(job_description, section, index=None):
+    """Queues a re-forge of one section against the target role; apply_reforged_section applies it."""
+    if not job_description:
+        st.error("Please paste a job description in the Target Role panel first.")
+        return
+    if has_job("reforge"):
+        st.warning("A re-forge is already running; wait for it or cancel it first.")
+        return
+    armory = st.session_state.app_state['armory']
+    # Roles are tracked by id, since the list may be edited while the job runs
+    item_id = armory['professional_history'][index]['_id'] if section == "professional_history" else None
+    # Clicking Re-forge again on an unchanged section would only replay the cached answer; ask for a new one
+    current = armory['professional_history'][index] if item_id else armory.get(section)
+    request_hash = canonical_hash(section, job_description, current)
+    refresh = st.session_state.get("forge_regenerate", False) or \
+        st.session_state.app_state.get('last_reforge') == request_hash
+    st.session_state.app_state['last_reforge'] = request_hash
+    submit_job("reforge", {"section": section, "index": index, "item_id": item_id}, armory_data=armory,
+               job_description=job_description, api_key=st.session_state.app_state['api_key'],
+               section=section, index=index, refresh=refresh)
+
+
+def apply_reforged_section(reforged_armory, meta):
+    """Replaces only the re-forged section, keeping edits made elsewhere while the job ran."""
+    armory = st.session_state.app_state['armory']
+    if meta['section'] == "professional_history":
+        history = armory.get('professional_history', [])
+        positions = [i for i, job in enumerate(history) if job.get('_id') == meta['item_id']]
+        # A role removed in the meantime stays removed; the new one gets a fresh _id and fresh widgets
+        if positions: history[positions[0]] = reforged_armory['professional_history'][meta['index']]
+    else:
+        armory[meta['section']] = reforged_armory[meta['section']]
+        if meta['section'] == "awards_leadership": reset_award_widgets()
+
+
+def render_timings_panel(limit=10):
+    """Sidebar panel listing the stage timings of the most recent backend requests."""
+    with st.sidebar.expander("⏱️ Request Timings"):
+        traces = list(RECENT_TRACES)[-limit:][::-1]
+        if not traces:
+            st.caption("No requests yet.")
+        for record in traces:
+            status = "❌" if record['error'] else "✅"
+            st.markdown(f"{status} **{record['name']}** — {record['total_ms']:.0f} ms")
+            st.caption(" · ".join(f"{s['stage']} {s['ms']:.0f} ms" for s in record['spans']))
+            if record['counters']:
+                st.caption(" · ".join(f"{key}={value}" for key, value in sorted(record['counters'].items())))
+
+
+# --- ARMORY EDITOR SECTIONS ---
+ROLES_PER_PAGE = 10
+
+
+def ensure_item_ids(armory):
+    """
+    Gives every competency and role a stable "_id" used in widget keys, so removing one item
+    doesn't shift the keys (and state) of every item after it. Forged items arrive without one.
+    """
+    for item in armory.get('competencies', []) + armory.get('professional_history', []):
+        if '_id' not in item: item['_id'] = uuid.uuid4().hex[:10]
+
+
+def invalidate_stale_pdf():
+    """
+    Section fragments don't rerun the PDF panel, so once an edit makes the prepared PDF stale it is
+    dropped and the page reruns once, hiding a Download button that would serve the old CV.
+    """
+    pdf_state = st.session_state.app_state.get('pdf')
+    if pdf_state and pdf_state['armory_hash'] != canonical_hash(st.session_state.app_state['armory']):
+        st.session_state.app_state.pop('pdf')
+        st.rerun()
+
+
+@st.fragment
+def competencies_editor(job_description):
+    armory = st.session_state.app_state['armory']
+    st.subheader("Competencies")
+    for competency in armory['competencies']:
+        item_id = competency['_id']
+        c1, c2 = st.columns([4, 1])
+        with c1:
+            competency['title'] = st.text_input("Competency Title", value=competency.get('title', ''), key=f"comp_title_{item_id}")
+            competency['description'] = st.text_area("Description", value=competency.get('description', ''), key=f"comp_desc_{item_id}", height=100)
+        with c2:
+            st.write(" ") # Spacer for alignment
+            st.write(" ")
+            if st.button("Remove", key=f"remove_comp_{item_id}", use_container_width=True):
+                armory['competencies'].remove(competency)
+                st.rerun(scope="fragment")
+        st.markdown("<br>", unsafe_allow_html=True)
+
+    if st.button("Add Competency", use_container_width=True):
+        armory['competencies'].append({'title': 'New Competency', 'description': '', '_id': uuid.uuid4().hex[:10]})
+        st.rerun(scope="fragment")
+    if st.button("♻️ Re-forge Competencies for Target Role", use_container_width=True):
+        reforge_into_editor(job_description, "competencies")
+    invalidate_stale_pdf()
+
+
+@st.fragment
+def history_editor(job_description):
+    armory = st.session_state.app_state['armory']
+    history = armory['professional_history']
+    st.subheader("Professional History")
+
+    # Long histories are paged and collapsed so only a handful of roles hold live widgets
+    page_count = max(1, -(-len(history) // ROLES_PER_PAGE))
+    if st.session_state.get("history_page", 0) >= page_count: st.session_state["history_page"] = page_count - 1
+    page = st.session_state.get("history_page", 0)
+    if page_count > 1:
+        page = st.selectbox("Page", range(page_count), key="history_page",
+                            format_func=lambda p: f"Roles {p * ROLES_PER_PAGE + 1}–{min((p + 1) * ROLES_PER_PAGE, len(history))} of {len(history)}")
+    collapse = len(history) > 5
+
+    for i in range(page * ROLES_PER_PAGE, min((page + 1) * ROLES_PER_PAGE, len(history))):
+        job = history[i]
+        item_id = job['_id']
+        title = f"{job.get('role') or 'New Role'} — {job.get('company', '')}"
+        with st.expander(title, expanded=not collapse):
+            p1, p2 = st.columns([4, 1])
+            with p1:
+                job['role'] = st.text_input("Role", value=job.get('role', ''), key=f"role_{item_id}")
+                job['company'] = st.text_input("Company", value=job.get('company', ''), key=f"company_{item_id}")
+                job['dates'] = st.text_input("Dates", value=job.get('dates', ''), key=f"dates_{item_id}")
+                accomplishments_text = "\n".join(job.get('accomplishments', []))
+                updated_text = st.text_area("Accomplishments (one per line)", value=accomplishments_text, height=120, key=f"acc_{item_id}")
+                job['accomplishments'] = [line.strip() for line in updated_text.split('\n') if line.strip()]
+            with p2:
+                st.write(" ") # Spacer
+                st.write(" ")
+                if st.button("Remove", key=f"remove_role_{item_id}", use_container_width=True):
+                    history.remove(job)
+                    st.rerun(scope="fragment")
+                if st.button("♻️ Re-forge", key=f"reforge_role_{item_id}", use_container_width=True):
+                    reforge_into_editor(job_description, "professional_history", i)
+
+    def add_role():
+        history.append({'role': '', 'company': '', 'dates': '', 'accomplishments': [], '_id': uuid.uuid4().hex[:10]})
+        st.session_state["history_page"] = (len(history) - 1) // ROLES_PER_PAGE  # jump to the new role
+
+    st.button("Add Role", on_click=add_role, use_container_width=True)
+    invalidate_stale_pdf()
+
+
+@st.fragment
+def awards_editor(job_description):
+    armory = st.session_state.app_state['armory']
+    st.subheader("Awards & Leadership")
+    # Iterate over a copy of keys so we can delete from the original dict
+    for category in list(armory['awards_leadership'].keys()):
+        a1, a2 = st.columns([4, 1])
+        with a1:
+            armory['awards_leadership'][category] = st.text_area(
+                label=category, value=armory['awards_leadership'][category], key=f"award_{category}"
+            )
+        with a2:
+            st.write(" ") # Spacer
+            st.write(" ")
+            if st.button("Remove", key=f"remove_award_{category}", use_container_width=True):
+                del armory['awards_leadership'][category]
+                st.rerun(scope="fragment")
+
+    if st.button("♻️ Re-forge Awards for Target Role", use_container_width=True):
+        reforge_into_editor(job_description, "awards_leadership")
+
+    st.write("Add a new category:")
+    n1, n2 = st.columns([3, 1])
+    with n1:
+        new_category = st.text_input("New Category Name", key="new_award_category_name", label_visibility="collapsed")
+    with n2:
+        if st.button("Add Category", use_container_width=True):
+            if new_category and new_category not in armory['awards_leadership']:
+                armory['awards_leadership'][new_category] = "Description..."
+                st.rerun(scope="fragment")
+    invalidate_stale_pdf()
+
+
+def store_rendered_pdf(pdf_bytes, meta):
+    st.session_state.app_state['pdf'] = {"armory_hash": meta['armory_hash'], "bytes": pdf_bytes}
+
+
+@st.fragment
+def pdf_export_panel():
+    # Section edits that make the PDF stale rerun the page (invalidate_stale_pdf), so this check stays current
+    armory = st.session_state.app_state['armory']
+    armory_hash = canonical_hash(armory)
+    pdf_state = st.session_state.app_state.get('pdf', {})
+    if st.button("🖨️ Prepare PDF", use_container_width=True, disabled=has_job("render")):
+        # The job renders a copy, so the hash taken now still describes the PDF it produces
+        submit_job("render", {"armory_hash": armory_hash}, armory_data=armory)
+    if pdf_state.get('armory_hash') == armory_hash:
+        st.download_button(
+            label="📄 Download as PDF", data=pdf_state['bytes'],
+            file_name=f"{armory.get('candidate_name', 'CV').replace(' ', '')}_TradCV.pdf",
+            mime="application/pdf", use_container_width=True
+        )
+        st.caption("Editing the armory hides this button until the PDF is prepared again.")
+
+
+if st.sidebar.toggle("Show performance panel", value=False):
+    render_timings_panel()
 
 # ==============================================================================
 # PHASE 1: SETUP (Main Screen) - No changes here
@@ -29,23 +313,27 @@ if not st.session_state.app_state.get("armory_built"):
     with col2:
         api_key_input = st.text_input("Enter Your Google Gemini API Key", type="password")
 
-    if st.button("Parse CV & Open Editor", use_container_width=True, type="primary"):
+    # A file parsed before (e.g. re-uploaded after a session timeout) opens without another AI call
+    reparse = False
+    if uploaded_cv and get_cached_armory(uploaded_cv.getvalue()) is not None:
+        st.info("This exact CV was parsed before, so the Armory will open instantly.")
+        reparse = st.checkbox("Re-parse anyway")
+
+    if st.button("Parse CV & Open Editor", use_container_width=True, type="primary", disabled=has_job("parse")):
         if uploaded_cv and api_key_input:
-            with st.spinner("Analyzing your CV..."):
-                try:
-                    st.session_state.app_state['api_key'] = api_key_input
-                    file_bytes = uploaded_cv.getvalue()
-                    file_type = uploaded_cv.type.split('/')[1]
-                    if 'wordprocessingml' in file_type: file_type = 'docx'
-                    parsed_armory = parse_cv_to_json(file_bytes, file_type, api_key_input)
-                    st.session_state.app_state['armory'] = parsed_armory
-                    st.session_state.app_state['armory_built'] = True
-                    st.success("Armory Built! Opening Editor...")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Failed to parse CV. Error: {e}")
+            st.session_state.app_state['api_key'] = api_key_input
+            file_type = uploaded_cv.type.split('/')[1]
+            if 'wordprocessingml' in file_type: file_type = 'docx'
+            submit_job("parse", file_bytes=uploaded_cv.getvalue(), file_type=file_type, api_key=api_key_input,
+                       reparse=reparse)
         else:
             st.error("Please upload your CV and enter your API key.")
+
+    def open_parsed_armory(parsed_armory, meta):
+        st.session_state.app_state['armory'] = parsed_armory
+        st.session_state.app_state['armory_built'] = True
+
+    if has_job("parse"): job_status_panel("parse", "Analyzing your CV", open_parsed_armory)
     st.markdown("---")
     st.markdown("<p style='text-align: center; color: grey;'>Built by Dhruvil Raval</p>", unsafe_allow_html=True)
 
@@ -62,30 +350,91 @@ else:
     # --- LEFT COLUMN: Target Job and Actions ---
     with col1:
         st.header("🎯 Target Role")
-        job_description = st.text_area("Paste the job description here", height=400, label_visibility="collapsed")
-
-        if st.button("🚀 Forge & Update Armory", type="primary", use_container_width=True):
-            if not job_description:
-                st.error("Please paste a job description.")
-            else:
-                api_key = st.session_state.app_state['api_key']
-                armory = st.session_state.app_state['armory']
-                with st.spinner("Executing protocol..."):
-                    try:
-                        updated_armory_json = generate_cv(armory, job_description, api_key, return_json=True)
-                        st.session_state.app_state['armory'] = updated_armory_json
-                        st.success("Armory Updated!")
-                        st.rerun() # Rerun to reflect AI changes immediately
-                    except Exception as e:
-                        st.error(f"Forge Failed: {e}")
-
-        pdf_bytes = generate_cv(st.session_state.app_state['armory'], "Final PDF",
-                                st.session_state.app_state['api_key'], return_json=False)
-        st.download_button(
-            label="📄 Download as PDF", data=pdf_bytes,
-            file_name=f"{st.session_state.app_state['armory'].get('candidate_name', 'CV').replace(' ', '')}_TradCV.pdf",
-            mime="application/pdf", use_container_width=True
-        )
+        single_tab, batch_tab = st.tabs(["Single Role", "Batch"])
+
+        with single_tab:
+            job_description = st.text_area("Paste the job description here", height=400, label_visibility="collapsed")
+
+            # One index per session; update() only re-tokenizes roles edited since the last rerun
+            relevance_index = st.session_state.app_state.setdefault('relevance_index', RelevanceIndex())
+            relevance_index.update(st.session_state.app_state['armory'])
+            if job_description:
+                history = st.session_state.app_state['armory'].get('professional_history', [])
+                best = relevance_index.top_roles(job_description, exclude={0, 1})
+                if best:
+                    st.caption("Best-matching earlier roles: " + ", ".join(
+                        f"{history[i].get('role', '')} at {history[i].get('company', '')}" for i in best))
+
+            # Identical forges are served from the response cache; this asks the model for a new take
+            # Also applies to the editor's section Re-forge buttons
+            regenerate = st.checkbox("Regenerate (ignore cached results for this role)", key="forge_regenerate")
+            if st.button("🚀 Forge & Update Armory", type="primary", use_container_width=True,
+                         disabled=has_job("forge")):
+                if not job_description:
+                    st.error("Please paste a job description.")
+                else:
+                    submit_job("forge", armory_data=st.session_state.app_state['armory'],
+                               job_description=job_description, api_key=st.session_state.app_state['api_key'],
+                               refresh=regenerate)
+
+            def apply_forged_armory(updated_armory_json, meta):
+                st.session_state.app_state['armory'] = updated_armory_json
+                reset_award_widgets()
+
+            if has_job("forge"):
+                st.caption("Edits made while forging are replaced by the forged armory.")
+                job_status_panel("forge", "Forge", apply_forged_armory)
+
+            # Filled in after the editor runs, so the PDF always reflects this rerun's edits
+            pdf_slot = st.container()
+
+        with batch_tab:
+            st.caption("Paste several job descriptions, separated by a line containing only ---")
+            batch_text = st.text_area("Job descriptions", height=300, key="batch_jds", label_visibility="collapsed")
+            b1, b2 = st.columns(2)
+            with b1:
+                batch_workers = st.number_input("Concurrent forges", min_value=1, max_value=16, value=4)
+            with b2:
+                batch_rpm = st.number_input("Max requests / minute (0 = unlimited)", min_value=0, value=15)
+
+            if st.button("🚀 Forge Batch", use_container_width=True, disabled=has_job("batch")):
+                job_descriptions = split_job_descriptions(batch_text)
+                if not job_descriptions:
+                    st.error("Please paste at least one job description.")
+                else:
+                    st.session_state.app_state.pop('batch_zip', None)
+                    st.session_state.app_state.pop('batch_results', None)
+                    submit_job("batch", armory_data=st.session_state.app_state['armory'],
+                               job_descriptions=job_descriptions, api_key=st.session_state.app_state['api_key'],
+                               max_workers=int(batch_workers), requests_per_minute=int(batch_rpm))
+
+            def show_batch_results(summaries):
+                for summary in sorted(summaries, key=lambda r: r['index']):
+                    if summary['error']:
+                        st.error(f"#{summary['index'] + 1} {summary['label']}: {summary['error']}")
+                    else:
+                        st.success(f"#{summary['index'] + 1} {summary['label']} ({summary['elapsed']:.1f}s)")
+
+            def show_batch_progress(partial):
+                st.progress(partial['completed'] / partial['total'],
+                            text=f"Forging {partial['completed']} / {partial['total']}...")
+                show_batch_results(partial['results'])
+
+            def store_batch(result, meta):
+                st.session_state.app_state['batch_zip'] = result['zip']
+                st.session_state.app_state['batch_results'] = result['results']
+
+            if has_job("batch"):
+                job_status_panel("batch", "Batch Forge", store_batch, preview=show_batch_progress)
+            elif st.session_state.app_state.get('batch_results'):
+                show_batch_results(st.session_state.app_state['batch_results'])
+
+            if st.session_state.app_state.get('batch_zip'):
+                st.download_button(
+                    label="🗂️ Download Batch (ZIP)", data=st.session_state.app_state['batch_zip'],
+                    file_name=f"{st.session_state.app_state['armory'].get('candidate_name', 'CV').replace(' ', '')}_TradCV_batch.zip",
+                    mime="application/zip", use_container_width=True
+                )
 
     # --- RIGHT COLUMN: The Armory Editor ---
     with col2:
@@ -93,9 +442,10 @@ else:
         armory = st.session_state.app_state['armory']
 
         # Ensure armory substructures exist to prevent errors
-        if 'competencies' not in armory: armory['competencies'] = []
-        if 'professional_history' not in armory: armory['professional_history'] = []
-        if 'awards_leadership' not in armory: armory['awards_leadership'] = {}
+        if not armory.get('competencies'): armory['competencies'] = []
+        if not armory.get('professional_history'): armory['professional_history'] = []
+        if not armory.get('awards_leadership'): armory['awards_leadership'] = {}
+        ensure_item_ids(armory)
 
         if armory:
             # --- STATIC INFO ---
@@ -104,76 +454,19 @@ else:
             armory['education'] = st.text_input("Education", value=armory.get('education', ''))
             st.markdown("---")
 
-            # --- COMPETENCIES (Add/Remove) ---
-            st.subheader("Competencies")
-            for i, competency in enumerate(armory['competencies']):
-                c1, c2 = st.columns([4, 1])
-                with c1:
-                    competency['title'] = st.text_input("Competency Title", value=competency.get('title', ''), key=f"comp_title_{i}")
-                    competency['description'] = st.text_area("Description", value=competency.get('description', ''), key=f"comp_desc_{i}", height=100)
-                with c2:
-                    st.write(" ") # Spacer for alignment
-                    st.write(" ")
-                    if st.button("Remove", key=f"remove_comp_{i}", use_container_width=True):
-                        armory['competencies'].pop(i)
-                        st.rerun()
-                st.markdown("<br>", unsafe_allow_html=True)
-
-            if st.button("Add Competency", use_container_width=True):
-                armory['competencies'].append({'title': 'New Competency', 'description': ''})
-                st.rerun()
-            st.markdown("---")
-
+            if has_job("reforge"): job_status_panel("reforge", "Re-forge", apply_reforged_section)
 
-            # --- PROFESSIONAL HISTORY (Add/Remove) ---
-            st.subheader("Professional History")
-            for i, job in enumerate(armory['professional_history']):
-                p1, p2 = st.columns([4, 1])
-                with p1:
-                    job['role'] = st.text_input("Role", value=job.get('role', ''), key=f"role_{i}")
-                    job['company'] = st.text_input("Company", value=job.get('company', ''), key=f"company_{i}")
-                    job['dates'] = st.text_input("Dates", value=job.get('dates', ''), key=f"dates_{i}")
-                    accomplishments_text = "\n".join(job.get('accomplishments', []))
-                    updated_text = st.text_area("Accomplishments (one per line)", value=accomplishments_text, height=120, key=f"acc_{i}")
-                    job['accomplishments'] = [line.strip() for line in updated_text.split('\n') if line.strip()]
-                with p2:
-                    st.write(" ") # Spacer
-                    st.write(" ")
-                    if st.button("Remove", key=f"remove_role_{i}", use_container_width=True):
-                        armory['professional_history'].pop(i)
-                        st.rerun()
-                st.markdown("<br>", unsafe_allow_html=True)
-
-            if st.button("Add Role", use_container_width=True):
-                armory['professional_history'].append({'role': '', 'company': '', 'dates': '', 'accomplishments': []})
-                st.rerun()
+            # Each section is a fragment: editing one reruns only that section, not the whole page
+            competencies_editor(job_description)
+            st.markdown("---")
+            history_editor(job_description)
             st.markdown("---")
+            awards_editor(job_description)
 
-            # --- AWARDS & LEADERSHIP (Add/Remove) ---
-            st.subheader("Awards & Leadership")
-            # Iterate over a copy of keys so we can delete from the original dict
-            for category in list(armory['awards_leadership'].keys()):
-                a1, a2 = st.columns([4, 1])
-                with a1:
-                    armory['awards_leadership'][category] = st.text_area(
-                        label=category, value=armory['awards_leadership'][category], key=f"award_{category}"
-                    )
-                with a2:
-                    st.write(" ") # Spacer
-                    st.write(" ")
-                    if st.button("Remove", key=f"remove_award_{category}", use_container_width=True):
-                        del armory['awards_leadership'][category]
-                        st.rerun()
-
-            st.write("Add a new category:")
-            n1, n2 = st.columns([3, 1])
-            with n1:
-                new_category = st.text_input("New Category Name", key="new_award_category_name", label_visibility="collapsed")
-            with n2:
-                if st.button("Add Category", use_container_width=True):
-                    if new_category and new_category not in armory['awards_leadership']:
-                        armory['awards_leadership'][new_category] = "Description..."
-                        st.rerun()
+    # --- PDF EXPORT (rendered on demand, not on every rerun) ---
+    with pdf_slot:
+        pdf_export_panel()
+        if has_job("render"): job_status_panel("render", "PDF Render", store_rendered_pdf)
 
     st.markdown("---")
     st.markdown(
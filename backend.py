@@ -1,12 +1,55 @@
 import os
-import io
+import copy
 import json
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import threading
+import time
+import hashlib
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 from jinja2 import Environment, FileSystemLoader
-import PyPDF2
-import docx
+from render_cache import RenderCache
+from extraction import default_pdf_backend, extract_text
+from llm import get_client
+from llm_cache import ResponseCache
+from streaming import IncrementalJSONParser, apply_event
+from prompt_budget import estimate_tokens, select_matrix_archetypes, trim_job_description
+from relevance import RelevanceIndex
+from instrumentation import configure_from_env, count, record_span, span, traced
+
+TEMPLATE_NAME = 'template.html'
+
+# Shared across Streamlit sessions; set TRADCV_RENDER_CACHE_DIR to also persist PDFs on disk
+RENDER_CACHE = RenderCache(
+    max_entries=int(os.environ.get('TRADCV_RENDER_CACHE_SIZE', '64')),
+    disk_dir=os.environ.get('TRADCV_RENDER_CACHE_DIR') or None,
+    max_disk_entries=int(os.environ.get('TRADCV_RENDER_CACHE_DISK_SIZE', '1000')),
+    max_disk_bytes=int(os.environ.get('TRADCV_RENDER_CACHE_DISK_BYTES', str(500 * 1024 * 1024))),
+)
+
+# Persistent cache of Gemini responses, opened on first use; set TRADCV_LLM_CACHE_PATH to an empty string to disable
+_llm_cache_path = os.environ.get('TRADCV_LLM_CACHE_PATH', os.path.join('.tradcv_cache', 'llm_responses.sqlite3'))
+LLM_CACHE = ResponseCache(
+    _llm_cache_path,
+    ttl_seconds=int(os.environ.get('TRADCV_LLM_CACHE_TTL', str(7 * 24 * 3600))),
+    max_entries=int(os.environ.get('TRADCV_LLM_CACHE_SIZE', '2000')),
+) if _llm_cache_path else None
+
+# Extracted text and parsed armories keyed by the SHA-256 of the uploaded file, in the same database
+UPLOAD_CACHE = ResponseCache(
+    _llm_cache_path,
+    ttl_seconds=int(os.environ.get('TRADCV_LLM_CACHE_TTL', str(7 * 24 * 3600))),
+    max_entries=int(os.environ.get('TRADCV_UPLOAD_CACHE_SIZE', '500')),
+    table='uploads',
+) if _llm_cache_path else None
+
+# Forge prompts are compacted to roughly this many tokens; 0 disables compaction
+PROMPT_TOKEN_BUDGET = int(os.environ.get('TRADCV_PROMPT_TOKEN_BUDGET', '6000'))
+
+# How many locally ranked roles are suggested to the model in step 3 of the forge prompt
+SUGGESTED_ROLES = 3
+
+# Trace sinks selected via TRADCV_TRACE_SINKS, e.g. "logging,prometheus:/var/lib/node_exporter/tradcv.prom"
+TRACE_SINKS = configure_from_env()
 
 # --- STATIC CONSTANTS ---
 CV_CSS = """
@@ -45,26 +88,174 @@ DNA: Comfort with distress, P&L analysis, operational rigor, making tough decisi
 
 # --- CORE FUNCTIONS ---
 
-def parse_cv_to_json(cv_file_bytes, file_type, api_key):
+class RenderEngine:
     """
-    Uses a robust "Few-Shot" prompt with Gemini's JSON Mode for guaranteed, high-quality parsing,
-    including a dictionary for awards_leadership.
+    Process-wide holder for the compiled template, parsed stylesheet and font config.
+    The template is recompiled only when its file's mtime changes, so a render is layout only.
+    The compiled template is shared; the FontConfiguration (a Pango font map, not safe to use from
+    several threads at once) and the CSS bound to it are kept per thread, so renders can run in parallel.
     """
-    if not api_key: raise ValueError("API Key is required for parsing.")
-    genai.configure(api_key=api_key)
-    raw_text = ""
-    if file_type == "pdf":
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(cv_file_bytes))
-        for page in pdf_reader.pages: raw_text += page.extract_text()
-    elif file_type == "docx":
-        doc = docx.Document(io.BytesIO(cv_file_bytes))
-        for para in doc.paragraphs: raw_text += para.text + "\n"
+
+    def __init__(self, template_name=TEMPLATE_NAME, css_text=CV_CSS, search_path=None):
+        # The template ships next to this module, so renders work from any working directory
+        search_path = search_path or os.path.dirname(os.path.abspath(__file__))
+        self.template_name = template_name
+        self.template_path = os.path.join(search_path, template_name)
+        self.css_version = hashlib.sha256(css_text.encode('utf-8')).hexdigest()
+        self._css_text = css_text
+        self._search_path = search_path
+        self._lock = threading.Lock()
+        self._env = None
+        self._template = None
+        self._template_mtime = None
+        self._thread_fonts = threading.local()
+        self.template_version = None
+
+    def snapshot(self):
+        """
+        Returns (template, template_version) as one consistent pair, recompiling the template if it
+        changed. Callers that key a cache by the version must render with this same template.
+        """
+        mtime = os.path.getmtime(self.template_path)
+        with self._lock:
+            if self._env is None:
+                # auto_reload is off: staleness is decided here by mtime, not on every get_template
+                self._env = Environment(loader=FileSystemLoader(self._search_path), auto_reload=False)
+            if self._template is None or mtime != self._template_mtime:
+                with open(self.template_path, 'rb') as f:
+                    self.template_version = hashlib.sha256(f.read()).hexdigest()
+                self._env.cache.clear()
+                self._template = self._env.get_template(self.template_name)
+                self._template_mtime = mtime
+            return self._template, self.template_version
+
+    def _fonts(self):
+        """This thread's (css, font_config), created on its first render."""
+        fonts = self._thread_fonts
+        if not hasattr(fonts, 'css'):
+            fonts.font_config = FontConfiguration()
+            fonts.css = CSS(string=self._css_text, font_config=fonts.font_config)
+        return fonts.css, fonts.font_config
+
+    def versions(self):
+        _, template_version = self.snapshot()
+        return template_version, self.css_version
+
+    def render_html(self, render_data, template=None):
+        template = template or self.snapshot()[0]
+        return template.render(**render_data)
+
+    def html_to_pdf(self, html_content):
+        css, font_config = self._fonts()
+        return HTML(string=html_content).write_pdf(stylesheets=[css], font_config=font_config)
+
+    def render_pdf(self, render_data):
+        return self.html_to_pdf(self.render_html(render_data))
+
+
+RENDER_ENGINE = RenderEngine()
+
+
+def _cached_response(prompt, client, refresh):
+    """Returns (cached response text or None, cache key) and counts the hit or miss."""
+    if not LLM_CACHE: return None, None
+    with span("llm_cache_lookup"):
+        cache_key = LLM_CACHE.make_key(client.model_name, client.generation_config, prompt)
+        cached_text = LLM_CACHE.get(cache_key) if not refresh else None
+    count("llm_cache_hits" if cached_text is not None else "llm_cache_misses")
+    return cached_text, cache_key
+
+
+def _generate_json(prompt, client, refresh=False):
+    """
+    Sends a prompt through the client, serving repeats of the exact same request from LLM_CACHE.
+    With refresh=True the cache is bypassed for reading but still updated with the new answer.
+    """
+    cached_text, cache_key = _cached_response(prompt, client, refresh)
+    if cached_text is not None:
+        with span("json_decode"): return json.loads(cached_text)
+
+    count("prompt_bytes", len(prompt.encode('utf-8')))
+    with span("llm_call"): response_text = client.generate(prompt)
+    count("response_bytes", len(response_text.encode('utf-8')))
+    with span("json_decode"): parsed = json.loads(response_text)
+    # Only cache responses that decoded cleanly, so a malformed answer is retried next time
+    if LLM_CACHE: LLM_CACHE.set(cache_key, response_text)
+    return parsed
+
+
+def _stream_json(prompt, client, refresh=False):
+    """
+    Streaming counterpart of _generate_json. Yields the partially decoded object each time a
+    top-level field or list/dict entry completes; the last item yielded is the full object.
+    """
+    cached_text, cache_key = _cached_response(prompt, client, refresh)
+    if cached_text is not None:
+        yield json.loads(cached_text)
+        return
+
+    count("prompt_bytes", len(prompt.encode('utf-8')))
+    parser = IncrementalJSONParser()
+    partial, chunks = {}, []
+    started = time.perf_counter()
+    first_section = True
+    # llm_stream covers the whole stream, including time the caller spends between yields
+    with span("llm_stream"):
+        for chunk in client.stream(prompt):
+            chunks.append(chunk)
+            events = parser.feed(chunk)
+            for path, value in events: apply_event(partial, path, value)
+            if events:
+                if first_section:
+                    record_span("llm_first_section", (time.perf_counter() - started) * 1000)
+                    first_section = False
+                yield partial
+    response_text = "".join(chunks)
+    count("response_bytes", len(response_text.encode('utf-8')))
+    with span("json_decode"): parsed = json.loads(response_text)
+    if LLM_CACHE: LLM_CACHE.set(cache_key, response_text)
+    yield parsed
+
+
+def upload_digest(cv_file_bytes):
+    return hashlib.sha256(cv_file_bytes).hexdigest()
+
+
+def get_cached_armory(cv_file_bytes):
+    """Returns the armory previously parsed from these exact file bytes, or None."""
+    if not UPLOAD_CACHE: return None
+    cached = UPLOAD_CACHE.get(f"armory:{upload_digest(cv_file_bytes)}")
+    count("upload_cache_hits" if cached is not None else "upload_cache_misses")
+    return json.loads(cached) if cached is not None else None
+
+
+def _store_parsed_armory(cv_file_bytes, armory):
+    if UPLOAD_CACHE: UPLOAD_CACHE.set(f"armory:{upload_digest(cv_file_bytes)}", json.dumps(armory))
+
+
+def _extract_raw_text(cv_file_bytes, file_type, reparse=False):
+    """
+    Extracts (or reuses) the CV's raw text. The cache key includes the extraction backend, so
+    installing PyMuPDF re-extracts old uploads; reparse=True always extracts afresh.
+    """
+    backend = default_pdf_backend() if file_type == "pdf" else file_type
+    text_key = f"text:{file_type}:{backend}:{upload_digest(cv_file_bytes)}"
+    raw_text = UPLOAD_CACHE.get(text_key) if UPLOAD_CACHE and not reparse else None
+    if raw_text is None:
+        extracted = extract_text(cv_file_bytes, file_type)
+        for stage, seconds in extracted["timings"].items(): record_span(f"extract_{stage}", seconds * 1000)
+        raw_text = extracted["text"]
+        if UPLOAD_CACHE and raw_text: UPLOAD_CACHE.set(text_key, raw_text)
+    else:
+        count("extracted_text_cache_hits")
     if not raw_text or len(raw_text) < 50: raise ValueError(
         "Could not extract sufficient text from the uploaded CV file.")
+    return raw_text
 
-    model = genai.GenerativeModel('gemini-2.5-flash')
 
-    parsing_prompt = f"""
+def build_parsing_prompt(raw_text):
+    """Builds the few-shot parsing prompt for the raw CV text."""
+    return f"""
     You are an expert, precise CV parsing system. Your only task is to analyze raw CV text and convert it into a valid JSON object. Follow the comprehensive example provided exactly.
     --- EXAMPLE START ---
     CV TEXT:
@@ -109,24 +300,49 @@ def parse_cv_to_json(cv_file_bytes, file_type, api_key):
     '''
     """
 
-    generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-    safety_settings = {
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    }
+
+@traced("parse_cv")
+def parse_cv_to_json(cv_file_bytes, file_type, api_key, client=None, reparse=False):
+    """
+    Uses a robust "Few-Shot" prompt with Gemini's JSON Mode for guaranteed, high-quality parsing,
+    including a dictionary for awards_leadership.
+    A file that was parsed before is served from UPLOAD_CACHE unless reparse is set.
+    """
+    if not reparse:
+        cached_armory = get_cached_armory(cv_file_bytes)
+        if cached_armory is not None: return cached_armory
+    if client is None:
+        if not api_key: raise ValueError("API Key is required for parsing.")
+        client = get_client(api_key)
+    raw_text = _extract_raw_text(cv_file_bytes, file_type, reparse)
+    with span("build_prompt"): parsing_prompt = build_parsing_prompt(raw_text)
+    try:
+        armory = _generate_json(parsing_prompt, client, refresh=reparse)
+    except Exception as e:
+        raise ValueError(f"The AI failed to generate a valid JSON response during parsing. Error: {e}")
+    _store_parsed_armory(cv_file_bytes, armory)
+    return armory
+
+
+@traced("stream_parse_cv")
+def stream_parse_cv_to_json(cv_file_bytes, file_type, api_key, client=None, reparse=False):
+    """Streaming variant of parse_cv_to_json; yields the armory as it is parsed, ending with the full result."""
+    if not reparse:
+        cached_armory = get_cached_armory(cv_file_bytes)
+        if cached_armory is not None:
+            yield cached_armory
+            return
+    if client is None:
+        if not api_key: raise ValueError("API Key is required for parsing.")
+        client = get_client(api_key)
+    raw_text = _extract_raw_text(cv_file_bytes, file_type, reparse)
+    with span("build_prompt"): parsing_prompt = build_parsing_prompt(raw_text)
     try:
-        response = model.generate_content(parsing_prompt, generation_config=generation_config,
-                                          safety_settings=safety_settings)
-        return json.loads(response.text)
+        for armory in _stream_json(parsing_prompt, client, refresh=reparse):
+            yield armory
     except Exception as e:
-        if 'response' in locals():
-            try:
-                print("AI Response Parts:", response.parts)
-            except:
-                print("Could not retrieve AI response parts.")
         raise ValueError(f"The AI failed to generate a valid JSON response during parsing. Error: {e}")
+    _store_parsed_armory(cv_file_bytes, armory)
 
 
 def format_armory_for_prompt(armory_data):
@@ -145,24 +361,37 @@ def format_armory_for_prompt(armory_data):
     output += "Professional History (Verifiable Ground Truth):\n"
     if armory_data.get('professional_history'):
         for job in armory_data.get('professional_history', []):
-            accomplishments = job.get('accomplishments', [])
-            accomplishments_text = "\n".join(accomplishments)
-            output += f"Company: {job.get('company', '')} | Official Role: {job.get('role', '')} | Dates: {job.get('dates', '')} | Accomplishments: {accomplishments_text}\n"
+            output += _format_job_for_prompt(job)
     return output.strip()
 
 
-def build_intelligent_json_prompt(armory_data, job_description):
-    """Builds the intelligent 'Chain-of-Thought' prompt for the AI."""
+def _format_job_for_prompt(job):
+    accomplishments = job.get('accomplishments', [])
+    accomplishments_text = "\n".join(accomplishments)
+    return f"Company: {job.get('company', '')} | Official Role: {job.get('role', '')} | Dates: {job.get('dates', '')} | Accomplishments: {accomplishments_text}\n"
+
+
+def build_intelligent_json_prompt(armory_data, job_description, matrix_text=STRATEGIC_INTELLIGENCE_MATRIX_TEXT,
+                                  suggested_roles=None):
+    """
+    Builds the intelligent 'Chain-of-Thought' prompt for the AI.
+    suggested_roles are jobs a local relevance ranking picked as the best extra experiences for step 3.
+    """
     armory_text = format_armory_for_prompt(armory_data)
     latest_two_roles = armory_data.get('professional_history', [])[:2]
     latest_roles_text = " and ".join(
         [f"'{job.get('role', '')} at {job.get('company', '')}'" for job in latest_two_roles])
+    suggestion_text = ""
+    if suggested_roles:
+        suggestion_text = " A keyword pre-screen ranked these as the strongest matches: " + ", ".join(
+            f"'{job.get('role', '')} at {job.get('company', '')}'" for job in suggested_roles) + \
+            ". Prefer them unless another experience clearly supports the narrative better."
     return f"""
     You are an ELITE career strategist. Your task is to analyze the provided data and generate a single JSON object to build a one-page CV.
     YOUR THOUGHT PROCESS (Mental Sandbox):
     1. Analyze Target: Read the Target Job Description. Identify its core archetype from the Strategic Intelligence Matrix and extract the top 3-5 most critical keywords/skills.
     2. Formulate Narrative: Based on this analysis, create a unique "Candidate Narrative."
-    3. Select Experiences: The two most recent roles ({latest_roles_text}) are mandatory. From the rest of the Armory, select ONLY 2-3 additional experiences that most powerfully support the unique Candidate Narrative.
+    3. Select Experiences: The two most recent roles ({latest_roles_text}) are mandatory. From the rest of the Armory, select ONLY 2-3 additional experiences that most powerfully support the unique Candidate Narrative.{suggestion_text}
     4. Weaponize Accomplishments: For every selected experience, rewrite the accomplishment bullet points to aggressively highlight the Key Skills and prove the Candidate Narrative.
     FINAL OUTPUT: After your thought process, generate a single JSON object that executes your strategy.
 
@@ -180,7 +409,7 @@ def build_intelligent_json_prompt(armory_data, job_description):
       "awards_leadership": {{ "Category 1": "...", "Category 2": "..." }}
     }}
     [STRATEGIC INTELLIGENCE MATRIX]
-    {STRATEGIC_INTELLIGENCE_MATRIX_TEXT}
+    {matrix_text}
     [THE ARMORY - VERIFIED CANDIDATE HISTORY]
     {armory_text}
     [TARGET JOB DESCRIPTION]
@@ -188,68 +417,229 @@ def build_intelligent_json_prompt(armory_data, job_description):
     """
 
 
-def generate_cv(armory_data, job_description, api_key, return_json=False):
+def build_budgeted_prompt(armory_data, job_description, token_budget=None, relevance_index=None):
     """
-    Handles both forging new JSON content and rendering a given armory to PDF.
+    Builds the forge prompt within a token budget. Boilerplate is trimmed from the job description,
+    only the matching matrix archetypes are kept, and beyond the two mandatory latest roles the armory's
+    roles are added in local relevance order until the budget is spent.
+    Returns (prompt, report) where report holds the baseline/final token estimates and what was dropped.
+    Pass a long-lived relevance_index to avoid re-tokenizing an unchanged armory.
     """
-    if not api_key: raise ValueError("API Key is required.")
-    genai.configure(api_key=api_key)
-    env = Environment(loader=FileSystemLoader('.'))
-    template = env.get_template('template.html')
+    token_budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    baseline_tokens = estimate_tokens(build_intelligent_json_prompt(armory_data, job_description))
+    jd_text = trim_job_description(job_description) or job_description
+    matrix_text = select_matrix_archetypes(STRATEGIC_INTELLIGENCE_MATRIX_TEXT, jd_text)
 
-    try:
-        if return_json:
-            # --- AI FORGING LOGIC ---
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            prompt = build_intelligent_json_prompt(armory_data, job_description)
-            generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-            safety_settings = {
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            }
-            response = model.generate_content(prompt, generation_config=generation_config,
-                                              safety_settings=safety_settings)
-            updated_json_content = json.loads(response.text)
-
-            # Merge AI content with user's static info to create the final armory
-            final_armory = {
-                "candidate_name": armory_data.get('candidate_name'),
-                "contact": armory_data.get('contact'),
-                "education": armory_data.get('education'),
-                "summary_text": updated_json_content.get("summary_text"),
-                "competencies": updated_json_content.get("competencies"),
-                "professional_history": updated_json_content.get("professional_history"),
-                "awards_leadership": updated_json_content.get("awards_leadership"),
-            }
-            return final_armory
-        else:
-            # --- PDF RENDERING LOGIC ---
-            # Ensure accomplishments are always a list before rendering
-            if armory_data.get("professional_history"):
-                for job in armory_data["professional_history"]:
-                    if isinstance(job.get("accomplishments"), str):
-                        job["accomplishments"] = [line.strip().lstrip('- ') for line in
-                                                  job["accomplishments"].split('\n') if line.strip()]
-
-            render_data = {
-                "summary": {
-                    "name": armory_data.get('candidate_name'), "contact": armory_data.get('contact'),
-                    "education": armory_data.get('education'), "summary_text": armory_data.get('summary_text')
-                },
-                "competencies": armory_data.get('competencies', []),
-                "professional_history": armory_data.get('professional_history', []),
-                "awards_leadership": armory_data.get('awards_leadership', {})
-            }
-            html_content = template.render(**render_data)
-            html = HTML(string=html_content)
-            css = CSS(string=CV_CSS)
-            return html.write_pdf(stylesheets=[css])
-    except Exception as e:
-        if 'response' in locals():
-            try:
-                print("AI Response Parts:", response.parts)
-            except:
-                print("Could not retrieve AI response parts.")
-        raise e
\ No newline at end of file
+    history = armory_data.get('professional_history') or []
+    index = relevance_index.update(armory_data) if relevance_index else RelevanceIndex(armory_data)
+    ranked = [i for i, _ in index.rank_roles(jd_text) if i >= 2]
+    selected = set(range(min(2, len(history))))
+
+    # Each role adds exactly its formatted line, so the budget can be filled without rebuilding the prompt
+    tokens = estimate_tokens(build_intelligent_json_prompt(
+        dict(armory_data, professional_history=history[:2]), jd_text, matrix_text))
+    for i in ranked:
+        role_tokens = estimate_tokens(_format_job_for_prompt(history[i]))
+        if token_budget and tokens + role_tokens > token_budget: continue
+        selected.add(i)
+        tokens += role_tokens
+
+    # Keep armory order so the first two roles stay the "latest two" the prompt calls mandatory
+    pruned = dict(armory_data, professional_history=[job for i, job in enumerate(history) if i in selected])
+    suggested = [history[i] for i in index.top_roles(jd_text, SUGGESTED_ROLES, exclude={0, 1}) if i in selected]
+    prompt = build_intelligent_json_prompt(pruned, jd_text, matrix_text, suggested)
+    tokens = estimate_tokens(prompt)
+    report = {
+        "baseline_tokens": baseline_tokens,
+        "tokens": tokens,
+        "saved_tokens": max(0, baseline_tokens - tokens),
+        "token_budget": token_budget,
+        "roles_included": len(selected),
+        "roles_dropped": len(history) - len(selected),
+        "over_budget": bool(token_budget) and tokens > token_budget,
+    }
+    return prompt, report
+
+
+def _forge_prompt(armory_data, job_description, token_budget, relevance_index=None):
+    if token_budget == 0 or (token_budget is None and not PROMPT_TOKEN_BUDGET):
+        index = relevance_index.update(armory_data) if relevance_index else RelevanceIndex(armory_data)
+        history = armory_data.get('professional_history') or []
+        suggested = [history[i] for i in index.top_roles(job_description, SUGGESTED_ROLES, exclude={0, 1})]
+        return build_intelligent_json_prompt(armory_data, job_description, suggested_roles=suggested)
+    prompt, report = build_budgeted_prompt(armory_data, job_description, token_budget, relevance_index)
+    count("prompt_tokens_saved", report["saved_tokens"])
+    return prompt
+
+
+# Per-section instructions and output shapes for the scoped re-forge prompt
+SECTION_SPECS = {
+    "summary_text": ('Write a new "summary_text": a single, dense, one-line sentence that embodies the candidate narrative for this role.',
+                     '{ "summary_text": "..." }'),
+    "competencies": ('Rewrite "competencies" as 3-5 items whose titles and descriptions mirror the critical skills of the role, grounded in the armory.',
+                     '{ "competencies": [ { "title": "...", "description": "..." } ] }'),
+    "awards_leadership": ('Regroup the awards into 1-3 logical category names that best support this role.',
+                          '{ "awards_leadership": { "Category 1": "...", "Category 2": "..." } }'),
+    "professional_history": ('Rewrite this single role\'s accomplishments as a maximum of TWO bullet points that aggressively highlight the key skills of the role. Keep role, company and dates unchanged.',
+                             '{ "professional_history": { "role": "...", "company": "...", "dates": "...", "accomplishments": ["...", "..."] } }'),
+}
+
+
+def build_section_prompt(armory_data, job_description, section, index=None):
+    """Builds a minimal prompt that re-forges one section (or one professional_history entry) only."""
+    if section not in SECTION_SPECS: raise ValueError(f"Unknown armory section: {section}")
+    instruction, structure = SECTION_SPECS[section]
+    history = armory_data.get('professional_history') or []
+    if section == "professional_history":
+        if index is None or not 0 <= index < len(history): raise ValueError(f"No role at index {index}.")
+        job = history[index]
+        context = (f"Company: {job.get('company', '')} | Official Role: {job.get('role', '')} | Dates: {job.get('dates', '')}\n"
+                   f"Accomplishments:\n" + "\n".join(job.get('accomplishments') or []))
+    elif section == "awards_leadership":
+        awards = armory_data.get('awards_leadership') or {}
+        context = "\n".join(f"{cat}: {val}" for cat, val in awards.items()) if isinstance(awards, dict) else str(awards)
+    else:
+        # Role headlines are enough context for summary and competencies; full bullets are not needed
+        context = "\n".join(f"{job.get('role', '')} at {job.get('company', '')} ({job.get('dates', '')})" for job in history)
+        if section == "competencies":
+            context += "\nCurrent competencies:\n" + "\n".join(
+                f"{c.get('title', '')}: {c.get('description', '')}" for c in armory_data.get('competencies') or [])
+        context = f"Education: {armory_data.get('education', '')}\n{context}"
+    return f"""
+    You are an ELITE career strategist tailoring one section of a one-page CV to the target job.
+    TASK: {instruction}
+    Use only facts from the candidate context. Your output must be ONLY a JSON object with this structure:
+    {structure}
+    [CANDIDATE CONTEXT]
+    {context}
+    [TARGET JOB DESCRIPTION]
+    {job_description}
+    """
+
+
+@traced("reforge_section")
+def reforge_section(armory_data, job_description, api_key, section, index=None, client=None, refresh=False):
+    """
+    Re-forges a single section (for professional_history, the single role at `index`) and returns a
+    new armory with only that part replaced; everything else is carried over from armory_data.
+    refresh=True skips the cached answer, so clicking Re-forge again gives a new variation.
+    """
+    if client is None:
+        if not api_key: raise ValueError("API Key is required.")
+        client = get_client(api_key)
+    with span("build_prompt"): prompt = build_section_prompt(armory_data, job_description, section, index)
+    response = _generate_json(prompt, client, refresh)
+    if not isinstance(response, dict): raise ValueError("The AI response was not a JSON object.")
+    updated_section = response.get(section)
+    if updated_section is None: raise ValueError(f'The AI response did not contain "{section}".')
+    # One role and the award categories are objects; competencies are a list; the summary is a string
+    expected = {"professional_history": dict, "awards_leadership": dict, "competencies": list, "summary_text": str}[section]
+    if not isinstance(updated_section, expected) or \
+            (section == "competencies" and not all(isinstance(item, dict) for item in updated_section)):
+        raise ValueError(f'The AI response for "{section}" has the wrong shape.')
+
+    final_armory = copy.deepcopy(armory_data)
+    if section == "professional_history":
+        final_armory["professional_history"][index] = updated_section
+    else:
+        final_armory[section] = updated_section
+    return final_armory
+
+
+@traced("forge")
+def forge_armory(armory_data, job_description, api_key, client=None, token_budget=None, relevance_index=None,
+                 refresh=False):
+    """
+    Forges a tailored armory for the job description and merges it with the user's static info.
+    token_budget overrides PROMPT_TOKEN_BUDGET for this call; 0 sends the full, uncompacted prompt.
+    refresh=True skips the cached answer for this exact request, so a re-forge yields a fresh variation.
+    """
+    if client is None:
+        if not api_key: raise ValueError("API Key is required.")
+        client = get_client(api_key)
+    with span("build_prompt"): prompt = _forge_prompt(armory_data, job_description, token_budget, relevance_index)
+    return _merge_forged_content(armory_data, _generate_json(prompt, client, refresh))
+
+
+@traced("stream_forge")
+def stream_forge_armory(armory_data, job_description, api_key, client=None, token_budget=None,
+                        relevance_index=None, refresh=False):
+    """
+    Streaming variant of forge_armory. Yields the merged armory each time another section arrives;
+    sections not yet received are None. The last item yielded is the complete forged armory.
+    """
+    if client is None:
+        if not api_key: raise ValueError("API Key is required.")
+        client = get_client(api_key)
+    with span("build_prompt"): prompt = _forge_prompt(armory_data, job_description, token_budget, relevance_index)
+    for partial in _stream_json(prompt, client, refresh):
+        yield _merge_forged_content(armory_data, partial)
+
+
+def _merge_forged_content(armory_data, updated_json_content):
+    # Merge AI content with user's static info to create the final armory
+    final_armory = {
+        "candidate_name": armory_data.get('candidate_name'),
+        "contact": armory_data.get('contact'),
+        "education": armory_data.get('education'),
+        "summary_text": updated_json_content.get("summary_text"),
+        "competencies": updated_json_content.get("competencies"),
+        "professional_history": updated_json_content.get("professional_history"),
+        "awards_leadership": updated_json_content.get("awards_leadership"),
+    }
+    return final_armory
+
+
+def _without_id(item):
+    return {key: value for key, value in item.items() if key != '_id'} if isinstance(item, dict) else item
+
+
+def build_render_data(armory_data):
+    """Normalises an armory into the context dict consumed by template.html."""
+    # Ensure accomplishments are always a list before rendering
+    if armory_data.get("professional_history"):
+        for job in armory_data["professional_history"]:
+            if isinstance(job.get("accomplishments"), str):
+                job["accomplishments"] = [line.strip().lstrip('- ') for line in
+                                          job["accomplishments"].split('\n') if line.strip()]
+
+    return {
+        "summary": {
+            "name": armory_data.get('candidate_name'), "contact": armory_data.get('contact'),
+            "education": armory_data.get('education'), "summary_text": armory_data.get('summary_text')
+        },
+        # Editor-only "_id" keys are dropped so the render cache stays keyed by content alone
+        "competencies": [_without_id(item) for item in armory_data.get('competencies') or []],
+        "professional_history": [_without_id(job) for job in armory_data.get('professional_history') or []],
+        "awards_leadership": armory_data.get('awards_leadership', {})
+    }
+
+
+@traced("render_pdf")
+def render_cv_pdf(armory_data):
+    """
+    Renders an armory to PDF bytes. Needs no API key, so it is safe to call from batch scripts.
+    """
+    render_data = build_render_data(armory_data)
+    # One snapshot for both the key and the render, so a template edit in between can't mislabel the PDF
+    template, template_version = RENDER_ENGINE.snapshot()
+    with span("render_cache_lookup"):
+        cache_key = RENDER_CACHE.make_key(render_data, template_version, RENDER_ENGINE.css_version)
+        pdf_bytes = RENDER_CACHE.get(cache_key)
+    count("render_cache_hits" if pdf_bytes is not None else "render_cache_misses")
+    if pdf_bytes is not None: return pdf_bytes
+
+    with span("template_render"): html_content = RENDER_ENGINE.render_html(render_data, template)
+    with span("weasyprint_layout"): pdf_bytes = RENDER_ENGINE.html_to_pdf(html_content)
+    count("pdf_bytes", len(pdf_bytes))
+    RENDER_CACHE.put(cache_key, pdf_bytes)
+    return pdf_bytes
+
+
+def generate_cv(armory_data, job_description, api_key, return_json=False, client=None):
+    """
+    Backwards-compatible entry point: forges new JSON content when return_json is set,
+    otherwise renders the given armory to PDF.
+    """
+    if return_json: return forge_armory(armory_data, job_description, api_key, client=client)
+    return render_cv_pdf(armory_data)
@@ -0,0 +1,83 @@
+import io
+import re
+import json
+import time
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backend import forge_armory, render_cv_pdf
+
+JD_SEPARATOR = re.compile(r'^\s*-{3,}\s*$', re.MULTILINE)
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly to stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval: return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+
+def split_job_descriptions(text):
+    """Splits pasted text into individual job descriptions on lines made of '---'."""
+    return [jd.strip() for jd in JD_SEPARATOR.split(text or "") if jd.strip()]
+
+
+def _forge_one(index, armory_data, job_description, api_key, limiter, render_pdf, client):
+    started = time.perf_counter()
+    result = {"index": index, "job_description": job_description, "armory": None, "pdf": None, "error": None}
+    try:
+        limiter.wait()
+        result["armory"] = forge_armory(armory_data, job_description, api_key, client=client)
+        if render_pdf: result["pdf"] = render_cv_pdf(result["armory"])
+    except Exception as e:
+        result["error"] = str(e)
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+def forge_batch(armory_data, job_descriptions, api_key, max_workers=4, requests_per_minute=None, render_pdf=True,
+                client=None):
+    """
+    Tailors one armory to many job descriptions concurrently.
+    Yields one result dict per job description as soon as it finishes (not in input order);
+    failures are reported in the result's "error" field instead of aborting the batch.
+    """
+    if not api_key and client is None: raise ValueError("API Key is required.")
+    limiter = RateLimiter(requests_per_minute)
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="forge")
+    try:
+        futures = [pool.submit(_forge_one, i, armory_data, jd, api_key, limiter, render_pdf, client)
+                   for i, jd in enumerate(job_descriptions)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A consumer that stops early (e.g. a Streamlit rerun) must not wait for, or pay for, the rest
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _slug(job_description, max_length=40):
+    first_line = next((line for line in job_description.splitlines() if line.strip()), "job")
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', first_line).strip('_')
+    return slug[:max_length] or "job"
+
+
+def bundle_results_zip(results):
+    """Packs each successful batch result's armory JSON and PDF into a single ZIP archive."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for result in sorted(results, key=lambda r: r["index"]):
+            if result.get("error"): continue
+            name = f"{result['index'] + 1:02d}_{_slug(result['job_description'])}"
+            archive.writestr(f"{name}.json", json.dumps(result["armory"], indent=2, ensure_ascii=False))
+            if result.get("pdf"): archive.writestr(f"{name}.pdf", result["pdf"])
+    return buffer.getvalue()
@@ -0,0 +1,173 @@
+"""
+Benchmarks for the prompt-building, render and extraction hot paths.
+
+Run from the repository root:
+    python -m benchmarks.bench --repeat 20 --output bench_output.txt
+
+Every measurement is written as one JSON object per line (stage, size, p50/p95/mean in ms,
+peak traced memory in KiB), so results can be diffed across releases.
+"""
+import os
+
+# Benchmarks must measure the work itself, never a cache hit
+os.environ['TRADCV_LLM_CACHE_PATH'] = ''
+
+import io
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+import statistics
+
+from backend import (RENDER_ENGINE, build_budgeted_prompt, build_intelligent_json_prompt, build_render_data,
+                     forge_armory, format_armory_for_prompt)
+from extraction import extract_text
+from llm import StubClient
+
+# name -> (roles, total accomplishments, award categories)
+SIZES = {
+    "small": (1, 0, 1),
+    "medium": (10, 40, 5),
+    "large": (25, 100, 12),
+    "xlarge": (50, 200, 30),
+}
+
+SAMPLE_JD = """Senior Product Manager, Payments Platform
+We are looking for a data-driven PM to own the roadmap for our payments platform, run A/B tests,
+define KPIs with stakeholders and lead GTM for new products at scale.
+""" * 3
+
+_WORDS = ("launched scaled designed optimised led built analysed modelled shipped reduced grew "
+          "platform latency revenue pipeline model users stakeholders roadmap experiment signal "
+          "portfolio valuation partners retention conversion infrastructure").split()
+
+
+def _sentence(rng, words=18):
+    return "- " + " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_armory(roles, accomplishments, award_categories, seed=0):
+    """Builds a deterministic armory with the given number of roles, bullets and award categories."""
+    rng = random.Random(seed)
+    history = [{"role": f"Role {i}", "company": f"Company {i}", "dates": f"{2024 - i} - {2025 - i}",
+                "accomplishments": []} for i in range(roles)]
+    for n in range(accomplishments):
+        history[n % roles]["accomplishments"].append(_sentence(rng))
+    return {
+        "candidate_name": "Bench Candidate",
+        "contact": "+44 0000 000000 | bench@example.com",
+        "education": "Example University — MEng, 2020",
+        "summary_text": _sentence(rng, 30),
+        "competencies": [{"title": f"Competency {i}", "description": _sentence(rng)} for i in range(4)],
+        "professional_history": history,
+        "awards_leadership": {f"Category {i}": _sentence(rng, 24) for i in range(award_categories)},
+    }
+
+
+def sample_docx(armory):
+    """Writes the armory to a DOCX with a header and a table, mirroring real-world CV layouts."""
+    import docx
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = armory["candidate_name"]
+    document.add_paragraph(armory["contact"])
+    table = document.add_table(rows=0, cols=2)
+    for category, text in armory["awards_leadership"].items():
+        cells = table.add_row().cells
+        cells[0].text, cells[1].text = category, text
+    for job in armory["professional_history"]:
+        document.add_paragraph(f"{job['role']}, {job['company']} ({job['dates']})")
+        for bullet in job["accomplishments"]: document.add_paragraph(bullet)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(fn, repeat):
+    """Returns timing percentiles (ms) over `repeat` runs and the peak traced memory of one run (KiB)."""
+    fn()  # warm-up: template compilation, imports, font discovery
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "peak_kib": round(peak / 1024, 1),
+        "repeat": repeat,
+    }
+
+
+def benchmark_size(size, repeat, stages):
+    roles, accomplishments, awards = SIZES[size]
+    armory = synthetic_armory(roles, accomplishments, awards)
+    render_data = build_render_data(armory)
+    html_content = RENDER_ENGINE.render_html(render_data)
+    forged_response = json.dumps({key: armory[key] for key in
+                                  ("summary_text", "competencies", "professional_history", "awards_leadership")})
+    stub = StubClient(forged_response)
+
+    cases = {
+        "format_armory_for_prompt": lambda: format_armory_for_prompt(armory),
+        "build_intelligent_json_prompt": lambda: build_intelligent_json_prompt(armory, SAMPLE_JD),
+        "build_budgeted_prompt": lambda: build_budgeted_prompt(armory, SAMPLE_JD),
+        "forge_stubbed": lambda: forge_armory(armory, SAMPLE_JD, None, client=stub),
+        "template_render": lambda: RENDER_ENGINE.render_html(render_data),
+        "weasyprint_pdf": lambda: RENDER_ENGINE.html_to_pdf(html_content),
+    }
+    if "extract_pdf" in stages:
+        pdf_bytes = RENDER_ENGINE.html_to_pdf(html_content)
+        cases["extract_pdf"] = lambda: extract_text(pdf_bytes, "pdf")
+    if "extract_docx" in stages:
+        docx_bytes = sample_docx(armory)
+        cases["extract_docx"] = lambda: extract_text(docx_bytes, "docx")
+
+    for stage, fn in cases.items():
+        if stage not in stages: continue
+        # PDF layout is orders of magnitude slower than prompt building; keep total runtime sane
+        runs = max(3, repeat // 4) if stage in ("weasyprint_pdf", "extract_pdf") else repeat
+        result = {"stage": stage, "size": size, "roles": roles, "accomplishments": accomplishments,
+                  "award_categories": awards}
+        result.update(measure(fn, runs))
+        yield result
+
+
+ALL_STAGES = ["format_armory_for_prompt", "build_intelligent_json_prompt", "build_budgeted_prompt", "forge_stubbed",
+              "template_render", "weasyprint_pdf", "extract_pdf", "extract_docx"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Trad CV render, prompt-building and parse paths.")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per stage (PDF stages use a quarter)")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--stages", nargs="+", choices=ALL_STAGES, default=ALL_STAGES)
+    parser.add_argument("--output", help="append JSON lines to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    meta = {"python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "template_version": RENDER_ENGINE.versions()[0][:12]}
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for size in args.sizes:
+            for result in benchmark_size(size, args.repeat, set(args.stages)):
+                result.update(meta)
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout: out.close()
+
+
+if __name__ == "__main__":
+    main()
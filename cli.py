@@ -0,0 +1,180 @@
+"""
+Headless PDF rendering for many armories at once, without the Streamlit UI.
+
+    python cli.py armories/ --out pdfs/                 # every *.json file in a directory
+    python cli.py armories.jsonl --out pdfs/ --workers 8
+    cat armories.jsonl | python cli.py - --out pdfs/
+
+Each PDF is written as soon as it is rendered and recorded in <out>/manifest.jsonl, so an
+interrupted run can simply be restarted: armories whose content hash (render data plus template
+and CSS versions) matches the manifest and whose PDF still exists are skipped.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from render_cache import canonical_hash
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def _safe_name(text, max_length=60):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', text or "").strip('._')[:max_length] or "cv"
+
+
+def iter_armories(source):
+    """
+    Yields (name, armory, error) for a directory of *.json files, a JSON-lines file, or "-" for stdin.
+    JSON-lines records may carry an "id" used as the output name; otherwise the line number and
+    candidate name are used so names stay stable across runs of the same file.
+    """
+    if source != "-" and os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if not filename.endswith(".json"): continue
+            name = _safe_name(filename[:-len(".json")])
+            try:
+                with open(os.path.join(source, filename), encoding="utf-8") as f:
+                    yield name, json.load(f), None
+            except (OSError, ValueError) as e:
+                yield name, None, f"{type(e).__name__}: {e}"
+        return
+
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip(): continue
+            try:
+                armory = json.loads(line)
+            except ValueError as e:
+                yield f"{line_number:05d}", None, f"{type(e).__name__}: {e}"
+                continue
+            if not isinstance(armory, dict):
+                yield f"{line_number:05d}", None, "Each line must be a JSON object"
+                continue
+            name = armory.get("id") or f"{line_number:05d}_{armory.get('candidate_name') or 'cv'}"
+            yield _safe_name(str(name)), armory, None
+    finally:
+        if stream is not sys.stdin: stream.close()
+
+
+def load_manifest(path):
+    """Returns name -> latest successful manifest entry; failed entries are retried on the next run."""
+    done = {}
+    if not os.path.exists(path): return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a run killed mid-write leaves a truncated last line
+            if entry.get("error"):
+                done.pop(entry.get("name"), None)
+            else:
+                done[entry.get("name")] = entry
+    return done
+
+
+def content_hash(armory_data):
+    """Same key the render cache uses, so template or CSS edits invalidate previous output."""
+    from backend import RENDER_ENGINE, build_render_data
+    return canonical_hash(build_render_data(armory_data), *RENDER_ENGINE.versions())
+
+
+def _render_one(armory_data, pdf_path):
+    """Runs in a worker process: renders one armory and writes the PDF atomically."""
+    from backend import render_cv_pdf
+    started = time.perf_counter()
+    pdf_bytes = render_cv_pdf(armory_data)
+    temp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(temp_path, pdf_path)
+    return len(pdf_bytes), round((time.perf_counter() - started) * 1000, 3)
+
+
+def render_all(source, out_dir, workers=None, force=False, render=_render_one):
+    """
+    Renders every armory from source into out_dir across a process pool, yielding one manifest
+    entry per armory as it finishes (skipped ones included). Only a bounded number of armories are
+    held in memory, so arbitrarily long JSON-lines streams are fine. render(armory, pdf_path) must
+    be picklable and return (bytes, ms).
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    done = {} if force else load_manifest(manifest_path)
+    max_pending = workers * 2
+
+    # spawn keeps workers from inheriting the parent's open SQLite handles and font state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool, \
+            open(manifest_path, "a", encoding="utf-8") as manifest:
+        pending = {}
+
+        def record(entry):
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            return entry
+
+        def drain(block_until):
+            while len(pending) > block_until:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = pending.pop(future)
+                    try:
+                        entry["bytes"], entry["ms"] = future.result()
+                        entry["status"] = "rendered"
+                    except Exception as e:
+                        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+                    yield record(entry)
+
+        for name, armory_data, error in iter_armories(source):
+            if error:
+                yield record({"name": name, "status": "failed", "error": error})
+                continue
+            try:
+                digest = content_hash(armory_data)
+            except Exception as e:
+                yield record({"name": name, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+                continue
+            pdf_path = os.path.join(out_dir, f"{name}.pdf")
+            previous = done.get(name)
+            if previous and previous.get("hash") == digest and os.path.exists(pdf_path):
+                # Not re-recorded: the manifest already holds this exact entry
+                yield {"name": name, "hash": digest, "pdf": pdf_path, "status": "skipped"}
+                continue
+            future = pool.submit(render, armory_data, pdf_path)
+            pending[future] = {"name": name, "hash": digest, "pdf": pdf_path}
+            yield from drain(max_pending - 1)
+        yield from drain(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render Trad CV armories to PDF without the UI.")
+    parser.add_argument("source", help="directory of *.json armories, a JSON-lines file, or - for stdin")
+    parser.add_argument("--out", required=True, help="output directory for PDFs and manifest.jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-render everything, ignoring the manifest")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    totals = {"rendered": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+    for entry in render_all(args.source, args.out, workers, args.force):
+        totals[entry["status"]] += 1
+        if not args.quiet: print(json.dumps(entry), flush=True)
+    elapsed = time.perf_counter() - started
+
+    rate = totals["rendered"] / elapsed if elapsed else 0.0
+    print(f"{totals['rendered']} rendered, {totals['skipped']} skipped, {totals['failed']} failed "
+          f"in {elapsed:.1f}s: {rate:.2f} PDFs/s, {rate / workers:.2f} PDFs/s per core ({workers} workers)",
+          file=sys.stderr)
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
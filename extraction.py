@@ -0,0 +1,147 @@
+import io
+import os
+import time
+import threading
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+# PyMuPDF is optional; when installed it is several times faster than PyPDF2 on long documents
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# Below this many pages the cost of shipping the file to worker processes outweighs the gain
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get('TRADCV_PARALLEL_PAGE_THRESHOLD', '16'))
+MAX_WORKERS = int(os.environ.get('TRADCV_EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Lazily starts one shared worker pool; spawn keeps workers independent of Streamlit's threads."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+# --- PDF BACKENDS ---
+# Each backend exposes count_pages(bytes) and extract_pages(bytes, start, stop) -> list of page strings,
+# so the same page-range chunking works for all of them in or out of process.
+
+def _pypdf2_count_pages(file_bytes):
+    import PyPDF2
+    return len(PyPDF2.PdfReader(io.BytesIO(file_bytes)).pages)
+
+
+def _pypdf2_extract_pages(file_bytes, start, stop):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _pymupdf_count_pages(file_bytes):
+    with fitz.open(stream=file_bytes, filetype="pdf") as document:
+        return document.page_count
+
+
+def _pymupdf_extract_pages(file_bytes, start, stop):
+    with fitz.open(stream=file_bytes, filetype="pdf") as document:
+        return [document[i].get_text() for i in range(start, stop)]
+
+
+PDF_BACKENDS = {
+    "pypdf2": (_pypdf2_count_pages, _pypdf2_extract_pages),
+}
+if fitz is not None: PDF_BACKENDS["pymupdf"] = (_pymupdf_count_pages, _pymupdf_extract_pages)
+
+
+def default_pdf_backend():
+    return "pymupdf" if "pymupdf" in PDF_BACKENDS else "pypdf2"
+
+
+def _extract_pdf(file_bytes, backend, timings):
+    count_pages, extract_pages = PDF_BACKENDS[backend]
+    started = time.perf_counter()
+    page_count = count_pages(file_bytes)
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if page_count >= PARALLEL_PAGE_THRESHOLD and MAX_WORKERS > 1:
+        chunk = -(-page_count // MAX_WORKERS)
+        starts = list(range(0, page_count, chunk))
+        stops = [min(start + chunk, page_count) for start in starts]
+        # map() yields chunks in page order, so pages can be appended as each range completes
+        pages = []
+        for chunk_pages in _get_pool().map(extract_pages, repeat(file_bytes), starts, stops):
+            pages.extend(chunk_pages)
+    else:
+        pages = extract_pages(file_bytes, 0, page_count)
+    timings["extract"] = time.perf_counter() - started
+    return pages, page_count
+
+
+# --- DOCX ---
+
+def _docx_block_texts(container):
+    """Yields paragraph and table text from a body, cell, header or footer in document order."""
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    for child in container._element.iterchildren():
+        tag = child.tag.rsplit('}', 1)[-1]
+        if tag == 'p':
+            yield Paragraph(child, container).text
+        elif tag == 'tbl':
+            for row in Table(child, container).rows:
+                cells = []
+                for cell in row.cells:
+                    cell_text = "\n".join(text for text in _docx_block_texts(cell) if text.strip())
+                    # Merged cells repeat the same cell object across the row; keep one copy
+                    if cell_text and (not cells or cells[-1] != cell_text): cells.append(cell_text)
+                if cells: yield " | ".join(cells)
+
+
+def _extract_docx(file_bytes, timings):
+    import docx
+    started = time.perf_counter()
+    document = docx.Document(io.BytesIO(file_bytes))
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parts, seen_headers = [], set()
+    for section in document.sections:
+        for part in (section.header, section.first_page_header):
+            if part.is_linked_to_previous: continue
+            text = "\n".join(t for t in _docx_block_texts(part) if t.strip())
+            if text and text not in seen_headers:
+                seen_headers.add(text)
+                parts.append(text)
+    parts.extend(_docx_block_texts(document._body))
+    timings["extract"] = time.perf_counter() - started
+    return parts
+
+
+def extract_text(file_bytes, file_type, pdf_backend=None):
+    """
+    Extracts the raw text of a CV. Returns a dict with "text", "backend", "pages" and per-stage
+    "timings" (load / extract / join, in seconds).
+    """
+    timings = {}
+    if file_type == "pdf":
+        backend = pdf_backend or default_pdf_backend()
+        if backend not in PDF_BACKENDS: raise ValueError(f"PDF extraction backend '{backend}' is not available.")
+        parts, page_count = _extract_pdf(file_bytes, backend, timings)
+    elif file_type == "docx":
+        backend, page_count = "python-docx", None
+        parts = _extract_docx(file_bytes, timings)
+    else:
+        raise ValueError(f"Unsupported CV file type: {file_type}")
+
+    started = time.perf_counter()
+    text = "\n".join(parts)
+    timings["join"] = time.perf_counter() - started
+    return {"text": text, "backend": backend, "pages": page_count, "timings": timings}
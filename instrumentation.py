@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+import inspect
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("tradcv.trace")
+
+_current_trace = contextvars.ContextVar("tradcv_trace", default=None)
+
+# Finished traces, newest last, for the in-app timings panel
+RECENT_TRACES = deque(maxlen=int(os.environ.get('TRADCV_RECENT_TRACES', '50')))
+_sinks = []
+_sinks_lock = threading.Lock()
+
+
+class Trace:
+    """Timings and counters collected for one backend request (a parse, forge or render)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.total_ms = None
+        self.error = None
+
+    def add_span(self, stage, elapsed_ms):
+        self.spans.append({"stage": stage, "ms": round(elapsed_ms, 3)})
+
+    def count(self, key, amount=1):
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self):
+        return {"name": self.name, "started_at": self.started_at, "total_ms": self.total_ms,
+                "spans": self.spans, "counters": self.counters, "error": self.error}
+
+
+@contextmanager
+def trace(name):
+    """
+    Starts a request trace and publishes it to the sinks when the block exits.
+    Inside an existing trace this only records a span, so nested backend calls roll up into one request.
+    """
+    parent = _current_trace.get()
+    if parent is not None:
+        with span(name):
+            yield parent
+        return
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator can be closed from a different context than it started in
+            _current_trace.set(None)
+        current.finish()
+        _publish(current)
+
+
+@contextmanager
+def span(stage):
+    """Times a stage of the current trace; a no-op outside of one."""
+    current = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if current is not None: current.add_span(stage, (time.perf_counter() - started) * 1000)
+
+
+def record_span(stage, elapsed_ms):
+    """Records an already-measured duration on the current trace, if any."""
+    current = _current_trace.get()
+    if current is not None: current.add_span(stage, elapsed_ms)
+
+
+def traced(name):
+    """Decorator that runs a function (or a generator, for its whole lifetime) inside trace(name)."""
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with trace(name):
+                    yield from fn(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(key, amount=1):
+    """Adds to a counter (bytes, tokens, cache hits...) on the current trace, if any."""
+    current = _current_trace.get()
+    if current is not None: current.count(key, amount)
+
+
+def _publish(finished):
+    RECENT_TRACES.append(finished.to_dict())
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        try:
+            sink.emit(finished.to_dict())
+        except Exception as e:
+            logger.warning("Trace sink %s failed: %s", type(sink).__name__, e)
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks: _sinks.remove(sink)
+
+
+# --- SINKS ---
+
+class LoggingSink:
+    """
+    Logs one summary line per trace. When nothing has configured the "tradcv.trace" logger, a stderr
+    handler is attached so the lines aren't dropped by Python's WARNING-level last-resort handler.
+    """
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            logger.addHandler(handler)
+            logger.propagate = False
+        if logger.level == logging.NOTSET or logger.level > level: logger.setLevel(level)
+
+    def emit(self, record):
+        stages = " ".join(f"{s['stage']}={s['ms']:.1f}ms" for s in record["spans"])
+        logger.log(self.level, "%s total=%.1fms %s %s", record["name"], record["total_ms"] or 0, stages,
+                   json.dumps(record["counters"], sort_keys=True))
+
+
+class JsonLinesSink:
+    """Appends each trace as a JSON object to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class PrometheusSink:
+    """
+    Aggregates traces into counters in the Prometheus text format. With a path, the metrics are
+    rewritten to that file after every trace, for node_exporter's textfile collector (use a .prom name).
+    """
+
+    def __init__(self, path=None, prefix="tradcv"):
+        self.path = path
+        self.prefix = prefix
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._stage_seconds = {}
+        self._counters = {}
+
+    def emit(self, record):
+        with self._lock:
+            self._requests[record["name"]] = self._requests.get(record["name"], 0) + 1
+            for s in record["spans"]:
+                total, n = self._stage_seconds.get(s["stage"], (0.0, 0))
+                self._stage_seconds[s["stage"]] = (total + s["ms"] / 1000, n + 1)
+            for key, value in record["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+        if self.path: self.write(self.path)
+
+    def write(self, path):
+        """Atomically replaces path with the current metrics, so a scrape never reads a partial file."""
+        with self._write_lock:
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+
+    def render(self):
+        p = self.prefix
+        with self._lock:
+            lines = [f"# TYPE {p}_requests_total counter"]
+            lines += [f'{p}_requests_total{{request="{name}"}} {n}' for name, n in sorted(self._requests.items())]
+            lines.append(f"# TYPE {p}_stage_seconds summary")
+            for stage, (total, n) in sorted(self._stage_seconds.items()):
+                lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {n}')
+            for key, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {p}_{key}_total counter")
+                lines.append(f"{p}_{key}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def configure_from_env():
+    """
+    Installs sinks from TRADCV_TRACE_SINKS, a comma-separated list of
+    "logging", "jsonl:<path>" and "prometheus:<path>". Returns the sinks that were added.
+    """
+    added = []
+    for spec in filter(None, (s.strip() for s in os.environ.get('TRADCV_TRACE_SINKS', '').split(','))):
+        if spec == "logging":
+            added.append(add_sink(LoggingSink()))
+        elif spec.startswith("jsonl:"):
+            added.append(add_sink(JsonLinesSink(spec[len("jsonl:"):])))
+        elif spec.startswith("prometheus:"):
+            added.append(add_sink(PrometheusSink(spec[len("prometheus:"):])))
+        elif spec == "prometheus":
+            logger.warning("The prometheus trace sink needs an output file: use prometheus:<path>.prom")
+        else:
+            logger.warning("Unknown trace sink: %s", spec)
+    return added
@@ -0,0 +1,434 @@
+import os
+import copy
+import time
+import uuid
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("tradcv.jobs")
+
+# Gemini calls are I/O bound, so a modest thread pool serves many sessions
+JOB_WORKERS = int(os.environ.get('TRADCV_JOB_WORKERS', '8'))
+# Running jobs per user; further submissions wait in the queue instead of hogging workers
+JOBS_PER_USER = int(os.environ.get('TRADCV_JOBS_PER_USER', '2'))
+# Finished jobs are forgotten after this long
+JOB_RETENTION_SECONDS = int(os.environ.get('TRADCV_JOB_RETENTION_SECONDS', '3600'))
+
+# Each queue records a heartbeat this often; a queue silent for OWNER_TIMEOUT_SECONDS is taken for dead
+HEARTBEAT_SECONDS = 10
+OWNER_TIMEOUT_SECONDS = int(os.environ.get('TRADCV_JOB_OWNER_TIMEOUT', '60'))
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# --- BROKERS ---
+# A broker stores job records and hands queued jobs to workers while honouring the per-user cap.
+# Records are dicts: id, user, owner, kind, status, partial, result, error, cancel_requested and
+# submitted_at / started_at / finished_at timestamps. Job arguments (uploaded files, API keys) are
+# never part of a record: they stay in the submitting JobQueue, whose id is the record's owner,
+# and only that queue's workers claim the job.
+
+class MemoryBroker:
+    """In-process broker: job records in a dict and queued job ids in FIFO order."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._queue = deque()
+        self._running = {}
+        self._cond = threading.Condition()
+
+    def put(self, job):
+        with self._cond:
+            self._jobs[job["id"]] = job
+            self._queue.append(job["id"])
+            self._cond.notify_all()
+
+    def claim(self, owner, per_user_limit, timeout):
+        """Marks the owner's oldest queued job whose user is under the cap as running and returns it, or None."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for job_id in self._queue:
+                    job = self._jobs[job_id]
+                    if job["owner"] == owner and self._running.get(job["user"], 0) < per_user_limit:
+                        self._queue.remove(job_id)
+                        self._running[job["user"]] = self._running.get(job["user"], 0) + 1
+                        job.update(status="running", started_at=time.time())
+                        return dict(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: return None
+                self._cond.wait(remaining)
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None: return
+            was_running = job["status"] == "running"
+            job.update(fields)
+            if was_running and job["status"] in FINISHED_STATES:
+                self._running[job["user"]] -= 1
+                # A freed slot may unblock that user's next queued job
+                self._cond.notify_all()
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, user):
+        with self._cond:
+            return [dict(job) for job in self._jobs.values() if job["user"] == user]
+
+    def cancel(self, job_id):
+        """Cancels a queued job outright; a running job is flagged and stops at its next checkpoint."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None: return None
+            if job["status"] == "queued":
+                self._queue.remove(job_id)
+                job.update(status="cancelled", finished_at=time.time())
+            elif job["status"] == "running":
+                job["cancel_requested"] = True
+            return dict(job)
+
+    def cancel_requested(self, job_id):
+        with self._cond:
+            return bool(self._jobs.get(job_id, {}).get("cancel_requested"))
+
+    def heartbeat(self, owner):
+        """Every owner of an in-process broker lives in this process, so liveness needs no tracking."""
+
+    def purge(self, older_than, stale_before=None):
+        with self._cond:
+            doomed = [job_id for job_id, job in self._jobs.items()
+                      if job["status"] in FINISHED_STATES and job["finished_at"] < older_than]
+            for job_id in doomed: del self._jobs[job_id]
+
+
+class SQLiteBroker:
+    """
+    Local stand-in for a networked broker: job records live in one SQLite file, so several app
+    processes on the same machine share job status and the per-user cap. The file holds streamed
+    partials and results (parsed armories, PDFs) but never job arguments such as API keys or uploaded
+    CVs. Partials and results are pickled, which is only safe because the file is local to this deployment.
+    """
+
+    _COLUMNS = ("id", "user", "owner", "kind", "status", "partial", "result", "error", "cancel_requested",
+                "submitted_at", "started_at", "finished_at")
+    _PICKLED = ("partial", "result")
+
+    def __init__(self, path, poll_interval=0.2):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, "
+            "user TEXT NOT NULL, owner TEXT NOT NULL, kind TEXT NOT NULL, status TEXT NOT NULL, partial BLOB, "
+            "result BLOB, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, submitted_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, seq)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS owners (owner TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+
+    def _row_to_job(self, row, columns):
+        job = dict(zip(columns, row))
+        for key in self._PICKLED:
+            if job.get(key) is not None: job[key] = pickle.loads(job[key])
+        if "cancel_requested" in job: job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def put(self, job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, user, owner, kind, status, submitted_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job["id"], job["user"], job["owner"], job["kind"], job["status"], job["submitted_at"]))
+
+    def claim(self, owner, per_user_limit, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                # IMMEDIATE takes the write lock up front, so two processes never claim the same job
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    running = dict(self._conn.execute(
+                        "SELECT user, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY user").fetchall())
+                    claimed = None
+                    for job_id, user in self._conn.execute(
+                            "SELECT id, user FROM jobs WHERE status = 'queued' AND owner = ? ORDER BY seq", (owner,)):
+                        if running.get(user, 0) < per_user_limit:
+                            claimed = job_id
+                            break
+                    if claimed:
+                        self._conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                                           (time.time(), claimed))
+                        row = self._conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?",
+                                                 (claimed,)).fetchone()
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            if claimed: return self._row_to_job(row, self._COLUMNS)
+            if time.monotonic() >= deadline: return None
+            time.sleep(self.poll_interval)
+
+    def update(self, job_id, **fields):
+        values = [pickle.dumps(value) if key in self._PICKLED and value is not None else value
+                  for key, value in fields.items()]
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", values + [job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?",
+                                     (job_id,)).fetchone()
+        return self._row_to_job(row, self._COLUMNS) if row else None
+
+    def list(self, user):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE user = ? ORDER BY seq",
+                                      (user,)).fetchall()
+        return [self._row_to_job(row, self._COLUMNS) for row in rows]
+
+    def cancel(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, owner):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO owners (owner, seen_at) VALUES (?, ?)", (owner, time.time()))
+
+    def purge(self, older_than, stale_before=None):
+        """
+        Deletes jobs that finished before older_than. With stale_before, jobs whose owner has not sent
+        a heartbeat since then are failed first: a process that died leaves them "running" (holding
+        the user's slots) or queued forever, and only it ever had their arguments.
+        """
+        with self._lock:
+            if stale_before is not None:
+                dead = "owner NOT IN (SELECT owner FROM owners WHERE seen_at >= ?)"
+                self._conn.execute("UPDATE jobs SET status = 'failed', error = 'Worker stopped before finishing', "
+                                   f"finished_at = ? WHERE status = 'running' AND {dead}", (time.time(), stale_before))
+                self._conn.execute("UPDATE jobs SET status = 'failed', error = 'Submitting process went away', "
+                                   f"finished_at = ? WHERE status = 'queued' AND {dead}", (time.time(), stale_before))
+                self._conn.execute("DELETE FROM owners WHERE seen_at < ?", (stale_before,))
+            self._conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+                               (older_than,))
+
+
+# --- JOB HANDLERS ---
+# Each handler receives a JobContext first; streaming handlers publish partial results and stop
+# between chunks when the job is cancelled. Handlers import the backend when they run, so the
+# queue and brokers load without the PDF and Gemini stacks.
+
+class JobContext:
+    def __init__(self, broker, job_id):
+        self.broker = broker
+        self.job_id = job_id
+
+    def check_cancelled(self):
+        if self.broker.cancel_requested(self.job_id): raise JobCancelled()
+
+    def progress(self, partial):
+        # Streaming parsers keep mutating the nested lists and dicts of the object they yield;
+        # the UI must read a snapshot, not race the worker thread
+        self.broker.update(self.job_id, partial=copy.deepcopy(partial))
+
+
+def _consume_stream(context, stream):
+    latest = None
+    try:
+        for latest in stream:
+            context.check_cancelled()
+            context.progress(latest)
+    finally:
+        # Closing the generator abandons the Gemini stream instead of reading it to the end
+        stream.close()
+    return latest
+
+
+def _parse_job(context, file_bytes, file_type, api_key, reparse=False):
+    from backend import stream_parse_cv_to_json
+    return _consume_stream(context, stream_parse_cv_to_json(file_bytes, file_type, api_key, reparse=reparse))
+
+
+def _forge_job(context, armory_data, job_description, api_key, refresh=False):
+    from backend import stream_forge_armory
+    return _consume_stream(context, stream_forge_armory(armory_data, job_description, api_key, refresh=refresh))
+
+
+def _reforge_job(context, armory_data, job_description, api_key, section, index=None, refresh=False):
+    from backend import reforge_section
+    context.check_cancelled()
+    return reforge_section(armory_data, job_description, api_key, section, index, refresh=refresh)
+
+
+def _batch_job(context, armory_data, job_descriptions, api_key, max_workers=4, requests_per_minute=None):
+    """Forges every job description; progress lists a summary per finished one, the result adds the ZIP."""
+    from batch import bundle_results_zip, forge_batch
+    results, summaries = [], []
+    batch = forge_batch(armory_data, job_descriptions, api_key, max_workers=max_workers,
+                        requests_per_minute=requests_per_minute)
+    try:
+        for result in batch:
+            results.append(result)
+            summaries.append({"index": result["index"], "label": result["job_description"].splitlines()[0][:80],
+                              "error": result["error"], "elapsed": result["elapsed"]})
+            context.progress({"completed": len(results), "total": len(job_descriptions), "results": summaries})
+            context.check_cancelled()
+    finally:
+        # Cancelling drops the forges that haven't started yet
+        batch.close()
+    return {"zip": bundle_results_zip(results), "results": summaries}
+
+
+def _render_job(context, armory_data):
+    from backend import render_cv_pdf
+    context.check_cancelled()
+    return render_cv_pdf(armory_data)
+
+
+JOB_HANDLERS = {
+    "parse": _parse_job,
+    "forge": _forge_job,
+    "reforge": _reforge_job,
+    "batch": _batch_job,
+    "render": _render_job,
+}
+
+
+# --- EXECUTOR ---
+
+class JobQueue:
+    """
+    Runs parse, forge, re-forge, batch and render jobs on background worker threads so Streamlit script threads
+    return immediately. Callers submit(), then poll get() for status, partial results and the result.
+    """
+
+    def __init__(self, broker=None, workers=JOB_WORKERS, per_user_limit=JOBS_PER_USER,
+                 retention_seconds=JOB_RETENTION_SECONDS):
+        self.broker = broker or MemoryBroker()
+        self.per_user_limit = per_user_limit
+        self.retention_seconds = retention_seconds
+        self.owner = uuid.uuid4().hex
+        # Job arguments by job id; kept here rather than in the broker so secrets never reach its storage
+        self._payloads = {}
+        self._payloads_lock = threading.Lock()
+        self._stopping = threading.Event()
+        # Registered before the first submit, so other processes never mistake this queue's jobs for orphans
+        self.broker.heartbeat(self.owner)
+        self._threads = [threading.Thread(target=self._work, name=f"tradcv-job-{i}", daemon=True)
+                         for i in range(workers)]
+        self._threads.append(threading.Thread(target=self._keep_alive, name="tradcv-job-heartbeat", daemon=True))
+        for thread in self._threads: thread.start()
+
+    def submit(self, user, kind, **payload):
+        """Queues a job and returns its id. Dict and list arguments are copied, so later edits don't leak in."""
+        if kind not in JOB_HANDLERS: raise ValueError(f"Unknown job kind: {kind}")
+        self.broker.purge(time.time() - self.retention_seconds, time.time() - OWNER_TIMEOUT_SECONDS)
+        job = {"id": uuid.uuid4().hex, "user": user, "owner": self.owner, "kind": kind, "status": "queued",
+               "partial": None, "result": None, "error": None, "cancel_requested": False,
+               "submitted_at": time.time(), "started_at": None, "finished_at": None}
+        with self._payloads_lock:
+            self._payloads[job["id"]] = {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+                                         for key, value in payload.items()}
+        self.broker.put(job)
+        return job["id"]
+
+    def get(self, job_id):
+        return self.broker.get(job_id)
+
+    def list(self, user):
+        return self.broker.list(user)
+
+    def cancel(self, job_id):
+        job = self.broker.cancel(job_id)
+        if job and job["status"] == "cancelled":
+            with self._payloads_lock:
+                self._payloads.pop(job_id, None)
+        return job
+
+    def shutdown(self, timeout=None):
+        self._stopping.set()
+        for thread in self._threads: thread.join(timeout)
+
+    def _keep_alive(self):
+        while not self._stopping.wait(HEARTBEAT_SECONDS):
+            try:
+                self.broker.heartbeat(self.owner)
+                self._drop_finished_payloads()
+            except Exception as e:
+                logger.warning("Job queue heartbeat failed: %s", e)
+
+    def _drop_finished_payloads(self):
+        """Forgets arguments of jobs that finished without being claimed, e.g. cancelled from another process."""
+        with self._payloads_lock:
+            job_ids = list(self._payloads)
+        for job_id in job_ids:
+            job = self.broker.get(job_id)
+            if job and job["status"] in FINISHED_STATES:
+                with self._payloads_lock:
+                    self._payloads.pop(job_id, None)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.broker.claim(self.owner, self.per_user_limit, timeout=1.0)
+            except Exception as e:
+                logger.warning("Claiming a job failed: %s", e)
+                time.sleep(1.0)
+                continue
+            if job is not None: self._run(job)
+
+    def _run(self, job):
+        context = JobContext(self.broker, job["id"])
+        with self._payloads_lock:
+            payload = self._payloads.pop(job["id"], None)
+        try:
+            if payload is None: raise RuntimeError("Job arguments are no longer available.")
+            result = JOB_HANDLERS[job["kind"]](context, **payload)
+            context.check_cancelled()
+            self.broker.update(job["id"], status="done", result=result, finished_at=time.time())
+        except JobCancelled:
+            self.broker.update(job["id"], status="cancelled", finished_at=time.time())
+        except Exception as e:
+            self.broker.update(job["id"], status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    The process-wide job queue, started on first use. TRADCV_JOB_BROKER selects the broker:
+    unset for the in-process queue, or "sqlite:<path>" to share job status and per-user caps between
+    local processes. Each process still runs only the jobs it submitted, because job arguments
+    (API keys, uploaded CVs) stay in memory; the SQLite file does hold parsed armories and PDFs.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            spec = os.environ.get('TRADCV_JOB_BROKER', '')
+            broker = SQLiteBroker(spec[len("sqlite:"):]) if spec.startswith("sqlite:") else MemoryBroker()
+            _queue = JobQueue(broker)
+        return _queue
@@ -0,0 +1,192 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as api_exceptions
+from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from instrumentation import count
+
+MODEL_NAME = 'gemini-2.5-flash'
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+REQUEST_TIMEOUT = float(os.environ.get('TRADCV_GEMINI_TIMEOUT', '120'))
+MAX_ATTEMPTS = int(os.environ.get('TRADCV_GEMINI_MAX_ATTEMPTS', '4'))
+# Transient failures worth retrying; anything else (bad key, blocked prompt...) fails immediately
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.Aborted,
+)
+
+# Any object with `model_name`, `generation_config` and `generate(prompt) -> str` can be passed
+# to the backend as `client=` (plus `stream(prompt)` yielding text chunks for the streaming APIs);
+# these two are the production client and a stand-in for tests.
+
+
+def _count_usage(usage):
+    """Records Gemini's reported token usage on the current trace."""
+    if usage is None: return
+    count("prompt_tokens", getattr(usage, 'prompt_token_count', 0) or 0)
+    count("response_tokens", getattr(usage, 'candidates_token_count', 0) or 0)
+
+
+def _backoff_delay(attempt, base=0.5, cap=8.0):
+    """Full-jitter exponential backoff, so concurrent sessions don't retry in lockstep."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class GeminiClient:
+    """
+    Gemini JSON-mode client used by the backend for parsing and forging.
+    Holds its own authenticated transport instead of relying on the process-global genai.configure,
+    so clients for different API keys can be used concurrently. Obtain shared instances via get_client().
+    """
+
+    def __init__(self, api_key, model_name=MODEL_NAME, generation_config=None, timeout=REQUEST_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS):
+        if not api_key: raise ValueError("API Key is required.")
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or JSON_GENERATION_CONFIG)
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self._model = genai.GenerativeModel(
+            self.model_name, safety_settings=SAFETY_SETTINGS,
+            generation_config=genai.types.GenerationConfig(**self.generation_config))
+        # google-generativeai has no public way to give one model its own credentials, so the private
+        # `_client` attribute is replaced (verified against the pinned 0.8.5). Fail loudly if an upgrade
+        # renames it, rather than silently sending every request with the global configuration.
+        if not hasattr(self._model, '_client'):
+            raise RuntimeError("Unsupported google-generativeai version: GenerativeModel._client not found.")
+        # The per-key service client owns the channel, which is reused for every request
+        self._model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._closing = False
+
+    @contextmanager
+    def _request(self):
+        """Tracks in-flight requests so close() never cuts one off mid-stream."""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                close_now = self._closing and not self._in_flight
+            if close_now: self._close_transport()
+
+    def _close_transport(self):
+        try:
+            self._model._client.transport.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Closes the gRPC channel now, or once the requests still using it have finished."""
+        with self._lock:
+            self._closing = True
+            close_now = not self._in_flight
+        if close_now: self._close_transport()
+
+    def _generate_content(self, prompt, stream=False):
+        return self._model.generate_content(prompt, stream=stream, request_options={"timeout": self.timeout})
+
+    def stream(self, prompt):
+        with self._request():
+            yield from self._stream(prompt)
+
+    def _stream(self, prompt):
+        for attempt in range(self.max_attempts):
+            usage, started = None, False
+            try:
+                for chunk in self._generate_content(prompt, stream=True):
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    if chunk.parts:
+                        started = True
+                        yield chunk.text
+                break
+            except RETRYABLE_ERRORS:
+                # Once text has been handed to the caller a retry would duplicate it
+                if started or attempt == self.max_attempts - 1: raise
+                count("llm_retries")
+                time.sleep(_backoff_delay(attempt))
+        _count_usage(usage)
+
+    def generate(self, prompt):
+        with self._request():
+            return self._generate(prompt)
+
+    def _generate(self, prompt):
+        for attempt in range(self.max_attempts):
+            try:
+                response = self._generate_content(prompt)
+                break
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_attempts - 1: raise
+                count("llm_retries")
+                time.sleep(_backoff_delay(attempt))
+        _count_usage(getattr(response, 'usage_metadata', None))
+        try:
+            return response.text
+        except Exception:
+            try:
+                print("AI Response Parts:", response.parts)
+            except:
+                print("Could not retrieve AI response parts.")
+            raise
+
+
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+MAX_POOLED_CLIENTS = int(os.environ.get('TRADCV_MAX_POOLED_CLIENTS', '32'))
+
+
+def get_client(api_key, model_name=MODEL_NAME):
+    """Returns the shared GeminiClient for this API key and model, creating it on first use."""
+    if not api_key: raise ValueError("API Key is required.")
+    # Key the pool by a digest so raw API keys are not kept around as dict keys
+    pool_key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest(), model_name)
+    with _clients_lock:
+        client = _clients.get(pool_key)
+        if client is None:
+            client = _clients[pool_key] = GeminiClient(api_key, model_name)
+        _clients.move_to_end(pool_key)
+        while len(_clients) > MAX_POOLED_CLIENTS:
+            _, evicted = _clients.popitem(last=False)
+            evicted.close()
+        return client
+
+
+class StubClient:
+    """Offline client that answers from canned responses and records every prompt it receives."""
+
+    def __init__(self, responses, model_name='stub', generation_config=None, chunk_size=64):
+        # `responses` is either a fixed string or a callable taking the prompt and returning a string
+        self.responses = responses
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or JSON_GENERATION_CONFIG)
+        self.chunk_size = chunk_size
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return self.responses(prompt) if callable(self.responses) else self.responses
+
+    def stream(self, prompt):
+        text = self.generate(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size]
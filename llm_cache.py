@@ -0,0 +1,97 @@
+import os
+import time
+import sqlite3
+import threading
+from render_cache import canonical_hash
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache for LLM responses, keyed by model, generation config and prompt hash.
+    Entries expire after ttl_seconds; the least recently used are evicted past max_entries / max_bytes.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=2000, max_bytes=200 * 1024 * 1024,
+                 table='responses'):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        """Opens the database on first use (caller holds the lock), so importing a module that
+        defines a cache, e.g. in a spawned worker, never touches the filesystem."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory: os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                f"size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model_name, generation_config, prompt):
+        return canonical_hash(model_name, generation_config, prompt)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    db.commit()
+                self.misses += 1
+                return None
+            db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now))
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db, now):
+        if self.ttl_seconds:
+            db.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, total = db.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes: return
+        # Walk from least to most recently used, dropping rows until both limits are met
+        doomed = []
+        for key, size in db.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"):
+            if count <= self.max_entries and total <= self.max_bytes: break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        db.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db().execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": total}
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute(f"DELETE FROM {self.table}")
+            db.commit()
+            self.hits = self.misses = 0
@@ -0,0 +1,113 @@
+import re
+from relevance import tokenize
+
+# Rough size of a Gemini token for English prose; good enough for budgeting, not for billing
+CHARS_PER_TOKEN = 4
+
+
+def _heading(phrases):
+    """A line that is nothing but one or more heading phrases ("Requirements & Qualifications:")."""
+    return re.compile(rf"^\W*({phrases})(\s*(&|and|/|,)\s*({phrases}))*\s*:?\s*$", re.IGNORECASE)
+
+
+# Headings of job-description sections that never help tailor a CV
+_BOILERPLATE_HEADINGS = _heading(
+    r"about (us|the company)|who we are|our (story|mission|values|culture)|benefits|perks"
+    r"|what we offer|why join us|compensation|equal (employment )?opportunit(y|ies)|diversity|eeo"
+    r"|accommodations?|privacy( notice)?|how to apply|application process|disclaimer")
+# Stand-alone boilerplate sentences that appear anywhere in a posting
+_BOILERPLATE_LINES = re.compile(
+    r"(equal opportunity employer|without regard to (race|age|gender)|reasonable accommodation|"
+    r"we (do not|don't) accept unsolicited|recruitment agencies|privacy (policy|notice)|apply now|"
+    r"click (here|apply)|we use cookies|cookie (policy|notice|settings|preferences)|follow us on|share this job)",
+    re.IGNORECASE)
+# Headings that (re)start the substantive part of a posting
+_ROLE_HEADINGS = _heading(
+    r"about (the (role|job|position|opportunity|team)|you)|the role|role overview|(key )?responsibilities"
+    r"|requirements|qualifications|skills|what you('ll| will) (do|bring)|who you are|your impact|nice to have"
+    r"|preferred|experience|the opportunity|what we('re| are) looking for")
+# Suffixes stripped before matching matrix keywords, so "trader" meets "trading"
+_SUFFIXES = ("ations", "ation", "ative", "ings", "ing", "ers", "er", "ies", "ed", "es", "s")
+
+
+def estimate_tokens(text):
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def trim_job_description(job_description):
+    """
+    Drops company boilerplate (about us, benefits, EEO and privacy notices, application steps)
+    and duplicate lines from a job description, keeping the role's actual requirements.
+    Returns the description unchanged when trimming would drop most of it, since that means an
+    unrecognised heading swallowed the requirements rather than that the posting is mostly boilerplate.
+    """
+    kept, seen, skipping, total = [], set(), False, 0
+    for line in (job_description or "").splitlines():
+        stripped = line.strip()
+        if not stripped: continue
+        total += 1
+        if len(stripped.split()) <= 6:
+            # A line that is only a heading starts a new section; boilerplate sections are skipped whole
+            if _ROLE_HEADINGS.match(stripped):
+                skipping = False
+            elif _BOILERPLATE_HEADINGS.match(stripped):
+                skipping = True
+                continue
+        if skipping or _BOILERPLATE_LINES.search(stripped): continue
+        normalised = " ".join(stripped.lower().split())
+        if normalised in seen: continue
+        seen.add(normalised)
+        kept.append(stripped)
+    if len(kept) * 2 < total: return (job_description or "").strip()
+    return "\n".join(kept)
+
+
+def parse_matrix(matrix_text):
+    """Splits the strategic intelligence matrix into (heading, block text, keyword set) entries."""
+    entries, heading, lines = [], None, []
+    for line in matrix_text.strip().splitlines():
+        if line.rstrip().endswith(":") and not line.startswith("DNA"):
+            if heading: entries.append((heading, lines))
+            heading, lines = line.strip(), []
+        elif heading:
+            lines.append(line.strip())
+    if heading: entries.append((heading, lines))
+
+    parsed = []
+    for heading, body in entries:
+        text = "\n".join([heading] + body)
+        keywords = re.search(r"Keywords:(.*?)(Archetype:|$)", " ".join(body))
+        terms = set(tokenize(heading)) | set(tokenize(keywords.group(1) if keywords else ""))
+        parsed.append((heading, text, terms))
+    return parsed
+
+
+def _stem(term):
+    for suffix in _SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 4: return term[:-len(suffix)]
+    return term
+
+
+def select_matrix_archetypes(matrix_text, job_description, max_archetypes=2):
+    """
+    Keeps only the matrix archetypes whose keywords appear in the job description.
+    Keywords match on a shared stem, so "Quant trader" meets "Quantitative" and "Trading".
+    Falls back to the full matrix when nothing matches, so the model can still classify the role.
+    """
+    jd_stems = {}
+    for term in set(tokenize(job_description)):
+        stem = _stem(term)
+        jd_stems.setdefault(stem[:4], set()).add(stem)
+
+    def found(term):
+        stem = _stem(term)
+        candidates = jd_stems.get(stem[:4], ())
+        if len(stem) < 4: return stem in candidates
+        return any(s.startswith(stem) or stem.startswith(s) for s in candidates)
+
+    scored = [(sum(map(found, terms)), i, text) for i, (_, text, terms) in enumerate(parse_matrix(matrix_text))]
+    best = max((s[0] for s in scored), default=0)
+    if not best: return matrix_text
+    # Archetypes matching only a stray keyword or two next to a clear winner are noise
+    matches = sorted((s for s in scored if s[0] * 2 >= best), key=lambda s: (-s[0], s[1]))[:max_archetypes]
+    return "\n" + "\n".join(text for _, _, text in sorted(matches, key=lambda s: s[1])) + "\n"
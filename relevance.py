@@ -0,0 +1,119 @@
+import re
+import hashlib
+from collections import Counter
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.&/-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to was were will with
+we you your they them who what which while within into over under per via across about after before than then
+also more most other such can may must should would could team role roles work working experience years year
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased content words; keeps tokens like c++, a/b, m&a and p&l intact."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def role_text(job):
+    accomplishments = job.get('accomplishments') or []
+    if isinstance(accomplishments, str): accomplishments = [accomplishments]
+    return " ".join([job.get('role') or '', job.get('company') or ''] + list(accomplishments))
+
+
+def _armory_documents(armory_data):
+    """(key, text) for every role and award category; keys are ("role", index) / ("award", category)."""
+    documents = [(("role", i), role_text(job)) for i, job in enumerate(armory_data.get('professional_history') or [])]
+    awards = armory_data.get('awards_leadership') or {}
+    if isinstance(awards, dict):
+        documents += [(("award", category), f"{category} {text}") for category, text in awards.items()]
+    return documents
+
+
+class RelevanceIndex:
+    """
+    BM25 index over an armory's roles and award categories, stored as CSR-style NumPy arrays.
+    Build it once per armory and call update() after edits: only documents whose text changed are
+    re-tokenized, and scoring a job description is a handful of vectorized operations.
+    """
+
+    def __init__(self, armory_data=None, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = []
+        self._vocabulary = {}
+        self._tokenized = {}  # text digest -> Counter of term ids, reused across updates
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._data = np.zeros(0, dtype=np.float64)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._doc_lengths = np.zeros(0, dtype=np.float64)
+        self._idf = np.zeros(0, dtype=np.float64)
+        self._signature = None
+        if armory_data is not None: self.update(armory_data)
+
+    def _term_counts(self, text):
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        counts = self._tokenized.get(digest)
+        if counts is None:
+            counts = Counter(self._vocabulary.setdefault(term, len(self._vocabulary)) for term in tokenize(text))
+            self._tokenized[digest] = counts
+        return digest, counts
+
+    def update(self, armory_data):
+        """Brings the index in line with the armory; a no-op when nothing relevant changed."""
+        documents = _armory_documents(armory_data)
+        per_document = [(key, *self._term_counts(text)) for key, text in documents]
+        signature = tuple((key, digest) for key, digest, _ in per_document)
+        if signature == self._signature: return self
+        self._signature = signature
+        # Forget tokenizations of texts that no longer exist so edits don't grow memory unboundedly
+        live = {digest for _, digest, _ in per_document}
+        self._tokenized = {digest: counts for digest, counts in self._tokenized.items() if digest in live}
+
+        self.keys = [key for key, _, _ in per_document]
+        lengths = [len(counts) for _, _, counts in per_document]
+        self._indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self._indices = np.fromiter((t for _, _, c in per_document for t in c.keys()), dtype=np.int64,
+                                    count=int(self._indptr[-1]))
+        self._data = np.fromiter((n for _, _, c in per_document for n in c.values()), dtype=np.float64,
+                                 count=int(self._indptr[-1]))
+        self._rows = np.repeat(np.arange(len(per_document)), lengths)
+        self._doc_lengths = np.array([sum(c.values()) for _, _, c in per_document], dtype=np.float64)
+
+        n_docs = len(per_document)
+        document_frequency = np.bincount(self._indices, minlength=len(self._vocabulary)).astype(np.float64)
+        self._idf = np.log(1 + (n_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+        return self
+
+    def score(self, job_description):
+        """BM25 score of every indexed document against the job description, in self.keys order."""
+        scores = np.zeros(len(self.keys), dtype=np.float64)
+        query = [self._vocabulary[t] for t in set(tokenize(job_description)) if t in self._vocabulary]
+        if not query or not len(self.keys): return scores
+        mask = np.isin(self._indices, np.array(query, dtype=np.int64))
+        if not mask.any(): return scores
+        rows, cols, tf = self._rows[mask], self._indices[mask], self._data[mask]
+        average_length = self._doc_lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[rows] / average_length)
+        contributions = self._idf[cols] * tf * (self.k1 + 1) / (tf + norm)
+        return np.bincount(rows, weights=contributions, minlength=len(self.keys))
+
+    def _ranked(self, job_description, kind):
+        scores = self.score(job_description)
+        ranked = [(key[1], float(scores[row])) for row, key in enumerate(self.keys) if key[0] == kind]
+        # Stable sort: ties keep armory order
+        return sorted(ranked, key=lambda pair: -pair[1])
+
+    def rank_roles(self, job_description):
+        """Returns (index, score) pairs for every role, best match first; ties keep armory order."""
+        return self._ranked(job_description, "role")
+
+    def rank_awards(self, job_description):
+        """Returns (category, score) pairs for every award category, best match first."""
+        return self._ranked(job_description, "award")
+
+    def top_roles(self, job_description, k=3, exclude=()):
+        """Indexes of the k best-matching roles with a positive score, skipping `exclude`."""
+        return [i for i, score in self.rank_roles(job_description) if score > 0 and i not in exclude][:k]
@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def canonical_hash(*parts):
+    """Stable SHA-256 over JSON-serialisable parts (dict key order does not matter)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = json.dumps(part, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        digest.update(encoded.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed cache for rendered PDF bytes.
+    A bounded in-memory LRU sits in front of an optional on-disk tier shared across sessions; the disk
+    tier is trimmed to max_disk_entries / max_disk_bytes, least recently used (by mtime) first.
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None, max_disk_entries=1000, max_disk_bytes=500 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def make_key(self, render_data, template_version, css_version):
+        return canonical_hash(render_data, template_version, css_version)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pdf")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    pdf_bytes = f.read()
+            except OSError:
+                pdf_bytes = None
+            if pdf_bytes is not None:
+                # Disk entries are evicted by mtime, so a hit marks the file as recently used
+                try:
+                    os.utime(self._disk_path(key))
+                except OSError:
+                    pass
+                self._remember(key, pdf_bytes)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return pdf_bytes
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, pdf_bytes):
+        self._remember(key, pdf_bytes)
+        if self.disk_dir:
+            # Write to a temp file first so a concurrent reader never sees a partial PDF
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(pdf_bytes)
+                os.replace(tmp_path, self._disk_path(key))
+                self._evict_disk()
+            except OSError as e:
+                print(f"Render cache could not write to disk: {e}")
+
+    def _evict_disk(self):
+        """Deletes the least recently used PDFs until the disk tier is within both limits."""
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith('.pdf'): continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed by another process meanwhile
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        count, total = len(files), sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if count <= self.max_disk_entries and total <= self.max_disk_bytes: break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            count -= 1
+            total -= size
+
+    def _remember(self, key, pdf_bytes):
+        with self._lock:
+            self._entries[key] = pdf_bytes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                    "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
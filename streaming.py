@@ -0,0 +1,110 @@
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a streamed JSON object.
+    feed() accepts raw text chunks and returns (path, value) events for every value that has been
+    completely received at depth <= max_depth, e.g. ("summary_text",) or ("professional_history", 0).
+    Deeper values are delivered as part of their enclosing value once it closes.
+    """
+
+    def __init__(self, max_depth=2):
+        self.max_depth = max_depth
+        self._text = ""
+        self._pos = 0
+        self._stack = []  # frames: {"type": "obj"|"arr", "path": tuple, "key": ..., "index": int, "start": int}
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._string_is_key = False
+        self._scalar_start = None
+        self._pending_path = ()
+
+    def feed(self, chunk):
+        self._text += chunk
+        events = []
+        text = self._text
+        while self._pos < len(text):
+            char = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    raw = text[self._string_start:self._pos + 1]
+                    if self._string_is_key:
+                        self._stack[-1]["key"] = json.loads(raw)
+                    else:
+                        self._complete(self._string_start, self._pos + 1, events)
+                self._pos += 1
+                continue
+
+            if self._scalar_start is not None and (char in ',}]' or char in _WHITESPACE):
+                self._complete(self._scalar_start, self._pos, events)
+                self._scalar_start = None
+
+            if char in _WHITESPACE:
+                pass
+            elif char in '{[':
+                path = self._begin_value()
+                self._stack.append({"type": "obj" if char == '{' else "arr", "path": path, "key": None,
+                                    "index": -1, "start": self._pos})
+                self._expect_key = char == '{'
+            elif char in '}]':
+                frame = self._stack.pop()
+                if self._stack:
+                    self._complete(frame["start"], self._pos + 1, events, path=frame["path"])
+                self._expect_key = False
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+                self._string_is_key = bool(self._stack) and self._stack[-1]["type"] == "obj" and self._expect_key
+                if not self._string_is_key: self._begin_value()
+            elif char == ':':
+                self._expect_key = False
+            elif char == ',':
+                self._expect_key = bool(self._stack) and self._stack[-1]["type"] == "obj"
+            elif self._scalar_start is None:
+                self._begin_value()
+                self._scalar_start = self._pos
+            self._pos += 1
+        return events
+
+    def _begin_value(self):
+        """Registers the start of a value in the current container and returns its path."""
+        if not self._stack: return ()
+        frame = self._stack[-1]
+        if frame["type"] == "arr":
+            frame["index"] += 1
+            self._pending_path = frame["path"] + (frame["index"],)
+        else:
+            self._pending_path = frame["path"] + (frame["key"],)
+        return self._pending_path
+
+    def _complete(self, start, end, events, path=None):
+        path = path if path is not None else self._pending_path
+        if 0 < len(path) <= self.max_depth:
+            events.append((path, json.loads(self._text[start:end])))
+
+
+def apply_event(target, path, value):
+    """Writes a parser event into a partially built dict, growing lists and dicts as needed."""
+    if len(path) == 1:
+        target[path[0]] = value
+        return
+    head, key = path
+    if isinstance(key, int):
+        container = target.setdefault(head, [])
+        if not isinstance(container, list): container = target[head] = []
+        while len(container) <= key: container.append(None)
+        container[key] = value
+    else:
+        container = target.setdefault(head, {})
+        if not isinstance(container, dict): container = target[head] = {}
+        container[key] = value
@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import pytest
+import cli
+from render_cache import canonical_hash
+
+
+def _fake_render(armory_data, pdf_path):
+    """Stands in for the WeasyPrint render; module-level so spawned workers can unpickle it."""
+    if armory_data.get("fail"): raise RuntimeError("render exploded")
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF " + json.dumps(armory_data, sort_keys=True).encode())
+    return 5, 0.1
+
+
+@pytest.fixture(autouse=True)
+def no_backend(monkeypatch):
+    monkeypatch.setattr(cli, "content_hash", lambda armory_data: canonical_hash(armory_data))
+
+
+def _run(source, out_dir, **kwargs):
+    return {e["name"]: e["status"] for e in cli.render_all(str(source), str(out_dir), workers=1,
+                                                            render=_fake_render, **kwargs)}
+
+
+def _write(directory, name, armory):
+    (directory / f"{name}.json").write_text(json.dumps(armory))
+
+
+def test_load_manifest_keeps_latest_success_and_forgets_failures(tmp_path):
+    path = tmp_path / cli.MANIFEST_NAME
+    path.write_text("\n".join([
+        json.dumps({"name": "a", "hash": "1", "status": "rendered"}),
+        json.dumps({"name": "b", "hash": "1", "status": "rendered"}),
+        json.dumps({"name": "a", "hash": "2", "status": "rendered"}),
+        json.dumps({"name": "b", "status": "failed", "error": "boom"}),
+        '{"name": "c", "ha',
+    ]))
+    assert cli.load_manifest(str(path)) == {"a": {"name": "a", "hash": "2", "status": "rendered"}}
+    assert cli.load_manifest(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_unchanged_armories_are_skipped_on_resume(tmp_path):
+    source, out = tmp_path / "armories", tmp_path / "pdfs"
+    source.mkdir()
+    for name in ("alice", "bob", "carol"): _write(source, name, {"candidate_name": name})
+    assert _run(source, out) == {"alice": "rendered", "bob": "rendered", "carol": "rendered"}
+
+    _write(source, "bob", {"candidate_name": "bob", "summary_text": "edited"})
+    os.remove(out / "carol.pdf")
+    assert _run(source, out) == {"alice": "skipped", "bob": "rendered", "carol": "rendered"}
+    assert b"edited" in (out / "bob.pdf").read_bytes()
+    assert _run(source, out, force=True) == {"alice": "rendered", "bob": "rendered", "carol": "rendered"}
+
+
+def test_failures_are_recorded_and_retried(tmp_path, monkeypatch):
+    out = tmp_path / "pdfs"
+    lines = [json.dumps({"id": "ok", "candidate_name": "Ada"}), "{not json", json.dumps({"id": "bad", "fail": True}),
+             json.dumps(["not", "an", "object"])]
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(lines) + "\n"))
+    assert _run("-", out) == {"ok": "rendered", "00002": "failed", "bad": "failed", "00004": "failed"}
+    manifest = [json.loads(line) for line in (out / cli.MANIFEST_NAME).read_text().splitlines()]
+    assert {e["name"]: e.get("error") for e in manifest}["bad"] == "RuntimeError: render exploded"
+
+    source = tmp_path / "armories.jsonl"
+    source.write_text(json.dumps({"id": "ok", "candidate_name": "Ada"}) + "\n" + json.dumps({"id": "bad"}) + "\n")
+    assert _run(source, out) == {"ok": "skipped", "bad": "rendered"}
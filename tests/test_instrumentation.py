@@ -0,0 +1,51 @@
+import json
+import logging
+import pytest
+import instrumentation
+from instrumentation import JsonLinesSink, LoggingSink, PrometheusSink, add_sink, count, remove_sink, span, trace
+
+
+@pytest.fixture
+def sink():
+    added = []
+    yield lambda s: added.append(add_sink(s)) or s
+    for s in added: remove_sink(s)
+
+
+def test_nested_traces_roll_up_into_one_request(sink):
+    records = sink(type("Collect", (), {"emit": lambda self, record: self.records.append(record),
+                                        "records": []})()).records
+    with trace("forge"):
+        with span("build_prompt"): count("prompt_bytes", 10)
+        with trace("render_pdf"): count("prompt_bytes", 5)
+    assert len(records) == 1
+    assert [s["stage"] for s in records[0]["spans"]] == ["build_prompt", "render_pdf"]
+    assert records[0]["counters"] == {"prompt_bytes": 15}
+
+
+def test_jsonl_and_prometheus_sinks_write_files(tmp_path, sink):
+    jsonl = tmp_path / "traces.jsonl"
+    prom = tmp_path / "tradcv.prom"
+    sink(JsonLinesSink(str(jsonl)))
+    sink(PrometheusSink(str(prom)))
+    for _ in range(2):
+        with trace("render_pdf"):
+            count("pdf_bytes", 100)
+    assert [json.loads(line)["name"] for line in jsonl.read_text().splitlines()] == ["render_pdf"] * 2
+    metrics = prom.read_text()
+    assert 'tradcv_requests_total{request="render_pdf"} 2' in metrics
+    assert "tradcv_pdf_bytes_total 200" in metrics
+
+
+def test_logging_sink_output_is_not_dropped(capsys, sink):
+    logger = instrumentation.logger
+    saved = (list(logger.handlers), logger.level, logger.propagate)
+    logger.handlers, logger.level = [], logging.NOTSET
+    try:
+        sink(LoggingSink())
+        with trace("parse_cv"):
+            pass
+        assert "parse_cv total=" in capsys.readouterr().err
+    finally:
+        logger.handlers, logger.propagate = saved[0], saved[2]
+        logger.setLevel(saved[1])
@@ -0,0 +1,198 @@
+import time
+import threading
+import pytest
+import jobs
+from jobs import JobQueue, MemoryBroker, SQLiteBroker
+
+
+def _wait_for(queue, job_id, *states, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in states: return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stayed {queue.get(job_id)['status']}, expected {states}")
+
+
+@pytest.fixture
+def gated(monkeypatch):
+    """A "gated" job kind that streams progress and blocks until its gate is opened."""
+    gates = {}
+
+    def handler(context, name, steps=1, fail=False):
+        gate = gates.setdefault(name, threading.Event())
+        partial = {"name": name, "steps": []}
+        for step in range(steps):
+            partial["steps"].append(step)
+            context.progress(partial)
+        while not gate.wait(0.01): context.check_cancelled()
+        if fail: raise ValueError(f"{name} failed")
+        return {"name": name, "steps": len(partial["steps"])}
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "gated", handler)
+    return lambda name: gates.setdefault(name, threading.Event())
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    broker = MemoryBroker() if request.param == "memory" else SQLiteBroker(str(tmp_path / "jobs.sqlite3"), 0.01)
+    job_queue = JobQueue(broker, workers=4, per_user_limit=1)
+    yield job_queue
+    job_queue.shutdown(timeout=2)
+
+
+def test_job_runs_and_returns_its_result(queue, gated):
+    job_id = queue.submit("alice", "gated", name="a", steps=2)
+    gated("a").set()
+    job = _wait_for(queue, job_id, "done")
+    assert job["result"] == {"name": "a", "steps": 2}
+    assert job["partial"] == {"name": "a", "steps": [0, 1]}
+    assert job["started_at"] >= job["submitted_at"] and job["finished_at"] >= job["started_at"]
+
+
+def test_per_user_cap_queues_extra_jobs_without_blocking_other_users(queue, gated):
+    first = queue.submit("alice", "gated", name="a1")
+    second = queue.submit("alice", "gated", name="a2")
+    other = queue.submit("bob", "gated", name="b1")
+    _wait_for(queue, first, "running")
+    _wait_for(queue, other, "running")
+    time.sleep(0.1)
+    assert queue.get(second)["status"] == "queued"
+
+    gated("a1").set()
+    _wait_for(queue, first, "done")
+    _wait_for(queue, second, "running")
+    gated("a2").set()
+    gated("b1").set()
+    _wait_for(queue, second, "done")
+    _wait_for(queue, other, "done")
+
+
+def test_cancel_queued_and_running_jobs(queue, gated):
+    running = queue.submit("alice", "gated", name="r")
+    queued = queue.submit("alice", "gated", name="q")
+    _wait_for(queue, running, "running")
+
+    assert queue.cancel(queued)["status"] == "cancelled"
+    assert queue.cancel(running)["cancel_requested"]
+    assert _wait_for(queue, running, "cancelled")["result"] is None
+    # The cancelled queued job never runs, and its arguments are dropped
+    time.sleep(0.1)
+    assert queue.get(queued)["status"] == "cancelled"
+    assert queued not in queue._payloads
+
+
+def test_failures_are_reported_and_free_the_slot(queue, gated):
+    failing = queue.submit("alice", "gated", name="f", fail=True)
+    after = queue.submit("alice", "gated", name="g")
+    gated("f").set()
+    assert _wait_for(queue, failing, "failed")["error"] == "ValueError: f failed"
+    gated("g").set()
+    _wait_for(queue, after, "done")
+
+
+def test_submitted_arguments_are_copied_and_never_stored_in_the_broker(queue, monkeypatch):
+    release = threading.Event()
+
+    def handler(context, armory, api_key):
+        release.wait(2)
+        return {"armory": armory, "has_key": api_key == "secret-key"}
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "echo", handler)
+    armory = {"summary_text": "before"}
+    job_id = queue.submit("alice", "echo", armory=armory, api_key="secret-key")
+    armory["summary_text"] = "edited after submit"
+    record = queue.get(job_id)
+    assert "secret-key" not in repr(record) and "before" not in repr(record)
+    release.set()
+    assert _wait_for(queue, job_id, "done")["result"] == {"armory": {"summary_text": "before"}, "has_key": True}
+
+
+def test_published_partials_are_snapshots(monkeypatch, gated):
+    queue = JobQueue(MemoryBroker(), workers=1)
+    shared = {"awards_leadership": {}}
+    release = threading.Event()
+
+    def handler(context):
+        shared["awards_leadership"]["Awards"] = "text"
+        context.progress(shared)
+        release.wait(2)
+        return shared
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "mutating", handler)
+    job_id = queue.submit("alice", "mutating")
+    _wait_for(queue, job_id, "running")
+    while queue.get(job_id)["partial"] is None: time.sleep(0.01)
+    partial = queue.get(job_id)["partial"]
+    assert partial == shared and partial["awards_leadership"] is not shared["awards_leadership"]
+    release.set()
+    _wait_for(queue, job_id, "done")
+    queue.shutdown(timeout=2)
+
+
+def test_sqlite_queues_only_run_their_own_jobs_but_share_the_cap(tmp_path, gated):
+    path = str(tmp_path / "shared.sqlite3")
+    first = JobQueue(SQLiteBroker(path, 0.01), workers=2, per_user_limit=1)
+    second = JobQueue(SQLiteBroker(path, 0.01), workers=2, per_user_limit=1)
+    try:
+        a = first.submit("alice", "gated", name="x1")
+        _wait_for(first, a, "running")
+        b = second.submit("alice", "gated", name="x2")
+        time.sleep(0.1)
+        # alice's slot is taken in the other process
+        assert second.get(b)["status"] == "queued"
+        gated("x1").set()
+        gated("x2").set()
+        _wait_for(first, a, "done")
+        assert _wait_for(second, b, "done")["result"] == {"name": "x2", "steps": 1}
+    finally:
+        first.shutdown(timeout=2)
+        second.shutdown(timeout=2)
+
+
+def test_unknown_job_kind_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.submit("alice", "nope")
+
+
+def test_purge_only_fails_jobs_whose_owner_stopped_sending_heartbeats(tmp_path, gated):
+    path = str(tmp_path / "shared.sqlite3")
+    live = JobQueue(SQLiteBroker(path, 0.01), workers=1, per_user_limit=1)
+    other = JobQueue(SQLiteBroker(path, 0.01), workers=1, retention_seconds=0)
+    try:
+        running = live.submit("alice", "gated", name="long")
+        queued = live.submit("alice", "gated", name="waiting")
+        _wait_for(live, running, "running")
+        now = time.time()
+        for job_id, status in (("ghost-run", "running"), ("ghost-wait", "queued")):
+            live.broker.put({"id": job_id, "user": "bob", "owner": "gone", "kind": "gated", "status": status,
+                             "submitted_at": now})
+        # Everything above is older than other's zero retention window, but only "gone" is dead
+        other.submit("carol", "gated", name="trigger")
+        assert live.get(running)["status"] == "running"
+        assert live.get(queued)["status"] == "queued"
+        assert live.get("ghost-run")["error"] == "Worker stopped before finishing"
+        assert live.get("ghost-wait")["error"] == "Submitting process went away"
+        gated("long").set()
+        gated("waiting").set()
+        _wait_for(live, queued, "done")
+    finally:
+        gated("trigger").set()
+        live.shutdown(timeout=2)
+        other.shutdown(timeout=2)
+
+
+def test_arguments_of_jobs_finished_elsewhere_are_dropped(tmp_path, gated):
+    path = str(tmp_path / "shared.sqlite3")
+    queue = JobQueue(SQLiteBroker(path, 0.01), workers=1, per_user_limit=1)
+    try:
+        running = queue.submit("alice", "gated", name="busy")
+        queued = queue.submit("alice", "gated", name="never", api_key="secret-key")
+        _wait_for(queue, running, "running")
+        # Another app process cancels the queued job through the shared file
+        SQLiteBroker(path).cancel(queued)
+        queue._drop_finished_payloads()
+        assert queued not in queue._payloads
+    finally:
+        gated("busy").set()
+        queue.shutdown(timeout=2)
@@ -0,0 +1,75 @@
+import time
+from llm_cache import ResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "cache" / "llm.sqlite3"), **kwargs)
+
+
+def test_make_key_depends_on_model_config_and_prompt():
+    key = ResponseCache.make_key("m", {"a": 1}, "prompt")
+    assert key == ResponseCache.make_key("m", {"a": 1}, "prompt")
+    assert len({key, ResponseCache.make_key("m2", {"a": 1}, "prompt"),
+                ResponseCache.make_key("m", {"a": 2}, "prompt"), ResponseCache.make_key("m", {"a": 1}, "other")}) == 4
+
+
+def test_round_trip_and_hit_miss_counters(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("k") is None
+    cache.set("k", '{"summary_text": "é"}')
+    assert cache.get("k") == '{"summary_text": "é"}'
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": len('{"summary_text": "é"}'.encode())}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    _cache(tmp_path).set("k", "v")
+    assert _cache(tmp_path).get("k") == "v"
+
+
+def test_expired_entries_are_misses_and_deleted(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.set("k", "v")
+    cache._db().execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_cap_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"  # "b" becomes least recently used
+    time.sleep(0.01)
+    cache.set("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_byte_cap_evicts_until_under_the_limit(tmp_path):
+    cache = _cache(tmp_path, max_bytes=25)
+    for i in range(5):
+        cache.set(f"k{i}", "x" * 10)
+        time.sleep(0.01)
+    stats = cache.stats()
+    assert stats["bytes"] <= 25 and stats["entries"] == 2
+    assert cache.get("k4") == "x" * 10 and cache.get("k0") is None
+
+
+def test_tables_in_one_file_are_independent(tmp_path):
+    responses = _cache(tmp_path, max_entries=1)
+    uploads = _cache(tmp_path, max_entries=1, table="uploads")
+    responses.set("k", "response")
+    uploads.set("k", "upload")
+    uploads.set("k2", "upload 2")
+    assert responses.get("k") == "response"
+    assert uploads.get("k") is None and uploads.get("k2") == "upload 2"
+    uploads.clear()
+    assert responses.get("k") == "response"
+
+
+def test_database_is_only_created_on_first_use(tmp_path):
+    cache = ResponseCache(str(tmp_path / "nested" / "cache.sqlite3"))
+    assert not (tmp_path / "nested").exists()
+    assert cache.get("k") is None
+    assert (tmp_path / "nested" / "cache.sqlite3").exists()
@@ -0,0 +1,89 @@
+from prompt_budget import select_matrix_archetypes, trim_job_description
+
+QUANT_JD = """Senior Quant Developer
+About Acme
+Acme is a systematic trading firm.
+About You
+5+ years C++ in low-latency trading systems
+Strong Python and statistics
+Benefits
+Private health insurance"""
+
+
+def test_about_you_is_kept_as_a_requirements_section():
+    trimmed = trim_job_description(QUANT_JD)
+    assert "5+ years C++ in low-latency trading systems" in trimmed
+    assert "Strong Python and statistics" in trimmed
+    assert "Private health insurance" not in trimmed
+
+
+def test_about_company_heading_does_not_swallow_the_role():
+    jd = "Data Scientist\nAbout the company\nWe are a fintech.\nYou will build ML models\nYou will own experiments"
+    trimmed = trim_job_description(jd)
+    assert "You will build ML models" in trimmed
+    assert "You will own experiments" in trimmed
+
+
+def test_boilerplate_sections_and_duplicates_are_dropped():
+    jd = ("Product Manager\nResponsibilities\nOwn the payments roadmap\nRun A/B tests\nOwn the payments roadmap\n"
+          "Benefits\nGym membership\nWe are an equal opportunity employer.")
+    assert trim_job_description(jd) == "Product Manager\nResponsibilities\nOwn the payments roadmap\nRun A/B tests"
+
+
+def test_falls_back_to_the_full_description_when_most_lines_would_go():
+    jd = "Analyst\nAbout us\nLine one\nLine two\nLine three\nLine four"
+    assert trim_job_description(jd) == jd
+
+
+MATRIX = """
+FINTECH PRODUCT:
+Keywords: payments, fintech, checkout
+QUANT TRADING:
+Keywords: quant, trading, latency
+"""
+
+
+def test_matrix_selection_keeps_matching_archetypes_only():
+    selected = select_matrix_archetypes(MATRIX, "Quant developer for our trading desk")
+    assert "QUANT TRADING:" in selected and "FINTECH PRODUCT:" not in selected
+
+
+def test_matrix_selection_falls_back_to_the_full_matrix_without_matches():
+    assert select_matrix_archetypes(MATRIX, "gardening and pottery") == MATRIX
+
+
+PRIVACY_JD = """Privacy Engineer
+Responsibilities
+Build data-mapping pipelines across our product surface
+Privacy impact assessments
+Ship consent and cookie management tooling for web and mobile
+Own GDPR and CCPA compliance automation
+Run threat modelling for new features
+Benefits
+Private health insurance
+We use cookies to improve your experience on this site."""
+
+
+def test_heading_phrases_inside_requirements_do_not_start_a_section():
+    trimmed = trim_job_description(PRIVACY_JD)
+    for line in ("Privacy impact assessments", "Ship consent and cookie management tooling for web and mobile",
+                 "Own GDPR and CCPA compliance automation", "Run threat modelling for new features"):
+        assert line in trimmed
+    assert "Private health insurance" not in trimmed
+    assert "We use cookies" not in trimmed
+
+
+def test_compound_headings_with_a_colon_are_recognised():
+    jd = "Engineer\nAbout us:\nWe are a bank.\nRequirements & Qualifications:\nRust\nKafka\nPerks:\nFree lunch"
+    assert trim_job_description(jd) == "Engineer\nRequirements & Qualifications:\nRust\nKafka"
+
+
+def test_matrix_keywords_match_on_shared_stems():
+    matrix = """
+FINTECH PRODUCT:
+Keywords: payments, fintech, checkout
+Quantitative, HFT, & Proprietary Trading:
+DNA: quantitative rigor. Keywords: Model, Signal, Probability, Statistics, Alpha. Archetype: "Intellectual Killer."
+"""
+    selected = select_matrix_archetypes(matrix, "Quant trader")
+    assert "Proprietary Trading:" in selected and "FINTECH PRODUCT:" not in selected
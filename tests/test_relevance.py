@@ -0,0 +1,66 @@
+from relevance import RelevanceIndex, tokenize
+
+
+def _armory():
+    return {
+        "professional_history": [
+            {"role": "Head of Product", "company": "Acme", "accomplishments": ["Led roadmap"]},
+            {"role": "PM", "company": "Beta", "accomplishments": ["Shipped onboarding"]},
+            {"role": "Analyst", "company": "Bank", "accomplishments": ["Built M&A valuation models", "DCF and LBO"]},
+            {"role": "Engineer", "company": "Shop", "accomplishments": ["Scaled payments checkout", "Cut latency"]},
+            {"role": "Intern", "company": "Lab", "accomplishments": ["Gardening robot"]},
+        ],
+        "awards_leadership": {"Awards": "Best valuation thesis", "Leadership": "Chess club captain"},
+    }
+
+
+def test_tokenize_keeps_symbols_and_drops_stopwords():
+    assert tokenize("The M&A team uses C++ and A/B tests") == ["m&a", "uses", "c++", "a/b", "tests"]
+
+
+def test_roles_are_ranked_by_bm25_relevance():
+    index = RelevanceIndex(_armory())
+    ranked = index.rank_roles("M&A valuation analyst: DCF models")
+    assert ranked[0][0] == 2
+    assert [i for i, score in ranked if score == 0] == [0, 1, 3, 4]  # ties keep armory order
+    assert index.rank_awards("valuation")[0][0] == "Awards"
+
+
+def test_top_roles_skips_excluded_and_unmatched_roles():
+    index = RelevanceIndex(_armory())
+    assert index.top_roles("payments latency and valuation", k=3, exclude={0, 1}) == [3, 2]
+    assert index.top_roles("payments", exclude={3}) == []
+    assert index.top_roles("") == []
+
+
+def test_rarer_terms_weigh_more():
+    armory = {"professional_history": [
+        {"role": "A", "company": "X", "accomplishments": ["python python"]},
+        {"role": "B", "company": "Y", "accomplishments": ["python kubernetes"]},
+        {"role": "C", "company": "Z", "accomplishments": ["python"]},
+    ]}
+    assert RelevanceIndex(armory).rank_roles("python kubernetes")[0][0] == 1
+
+
+def test_update_reindexes_edits_and_reuses_unchanged_tokenizations():
+    armory = _armory()
+    index = RelevanceIndex(armory)
+    tokenized = dict(index._tokenized)
+    assert index.update(armory) is index and index._tokenized == tokenized
+
+    armory["professional_history"][4]["accomplishments"] = ["Kubernetes platform migration"]
+    index.update(armory)
+    assert index.top_roles("kubernetes", exclude=()) == [4]
+    # Only the edited role was re-tokenized; the stale text was forgotten
+    assert len(set(index._tokenized) - set(tokenized)) == 1
+    assert len(index._tokenized) == len(tokenized)
+
+    del armory["professional_history"][2]
+    index.update(armory)
+    assert index.top_roles("valuation DCF", exclude=()) == []
+    assert len(index.rank_roles("x")) == 4
+
+
+def test_empty_armory_scores_nothing():
+    index = RelevanceIndex({})
+    assert index.rank_roles("anything") == [] and list(index.score("anything")) == []
@@ -0,0 +1,51 @@
+import os
+import time
+from render_cache import RenderCache, canonical_hash
+
+
+def test_canonical_hash_ignores_dict_order_but_not_content():
+    assert canonical_hash({"a": 1, "b": [1, 2]}, "v1") == canonical_hash({"b": [1, 2], "a": 1}, "v1")
+    assert canonical_hash({"a": 1}, "v1") != canonical_hash({"a": 1}, "v2")
+
+
+def test_memory_tier_is_an_lru():
+    cache = RenderCache(max_entries=2)
+    cache.put("a", b"A")
+    cache.put("b", b"B")
+    assert cache.get("a") == b"A"  # "b" is now least recently used
+    cache.put("c", b"C")
+    assert cache.get("b") is None and cache.get("a") == b"A" and cache.get("c") == b"C"
+    assert cache.stats() == {"hits": 3, "misses": 1, "disk_hits": 0, "entries": 2}
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    RenderCache(disk_dir=str(tmp_path)).put("k", b"%PDF")
+    fresh = RenderCache(disk_dir=str(tmp_path))
+    assert fresh.get("k") == b"%PDF" and fresh.stats()["disk_hits"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_disk_tier_evicts_least_recently_used_past_the_entry_cap(tmp_path):
+    cache = RenderCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=2)
+    cache.put("old", b"1")
+    cache.put("used", b"2")
+    _age(tmp_path / "old.pdf", 30)
+    _age(tmp_path / "used.pdf", 60)
+    cache.clear()
+    assert cache.get("used") == b"2"  # a disk hit refreshes the mtime
+    cache.put("new", b"3")
+    assert sorted(os.listdir(tmp_path)) == ["new.pdf", "used.pdf"]
+
+
+def test_disk_tier_respects_the_byte_cap(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path), max_disk_bytes=25)
+    for i in range(5):
+        cache.put(f"k{i}", b"x" * 10)
+        _age(tmp_path / f"k{i}.pdf", 100 - i)
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) <= 25
+    assert "k4.pdf" in os.listdir(tmp_path)
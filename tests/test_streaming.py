@@ -0,0 +1,79 @@
+import json
+import random
+import pytest
+from streaming import IncrementalJSONParser, apply_event
+
+DOCUMENT = {
+    "summary_text": "Quote \" backslash \\ brace } bracket ] comma , colon : unicode é ☃",
+    "competencies": [{"title": "A/B \"testing\"", "description": "x"}, {"title": "Risk", "description": "y"}],
+    "professional_history": [
+        {"role": "PM", "company": "Acme", "accomplishments": ["- Led {team}", "- Cut [latency]"]},
+        {"role": "Analyst", "company": "Beta", "accomplishments": []},
+    ],
+    "awards_leadership": {"Awards": "Best \\ paper", "Leadership": "Chair, \"Society\""},
+    "count": 42,
+    "ratio": -1.5e3,
+    "flags": [True, False, None],
+}
+
+
+def _feed_all(text, chunks):
+    parser, partial, events = IncrementalJSONParser(), {}, []
+    for chunk in chunks:
+        for path, value in parser.feed(chunk):
+            events.append((path, value))
+            apply_event(partial, path, value)
+    return partial, events
+
+
+def _split(text, sizes):
+    chunks, pos = [], 0
+    for size in sizes:
+        chunks.append(text[pos:pos + size])
+        pos += size
+    return chunks + [text[pos:]]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_chunk_boundary_rebuilds_the_document(indent):
+    text = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False)
+    for cut in range(1, len(text)):
+        partial, _ = _feed_all(text, [text[:cut], text[cut:]])
+        assert partial == DOCUMENT, f"split at {cut}: {text[cut - 5:cut + 5]!r}"
+
+
+def test_single_character_chunks_and_escaped_ascii():
+    text = json.dumps(DOCUMENT)  # ensure_ascii: \uXXXX escapes split across chunks
+    partial, _ = _feed_all(text, list(text))
+    assert partial == DOCUMENT
+
+
+def test_random_chunking():
+    text = json.dumps(DOCUMENT, indent=1)
+    rng = random.Random(7)
+    for _ in range(50):
+        partial, _ = _feed_all(text, _split(text, [rng.randint(1, 9) for _ in range(len(text) // 3)]))
+        assert partial == DOCUMENT
+
+
+def test_events_arrive_as_soon_as_each_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"summary_text": "Hel') == []
+    assert parser.feed('lo", "competencies": [{"title": "A"}') == [
+        (("summary_text",), "Hello"), (("competencies", 0), {"title": "A"})]
+    # The closed list is reported too; a number is only complete once a delimiter follows it
+    assert parser.feed('], "count": 12') == [(("competencies",), [{"title": "A"}])]
+    assert parser.feed('3}') == [(("count",), 123)]
+
+
+def test_values_deeper_than_max_depth_arrive_with_their_parent():
+    parser = IncrementalJSONParser(max_depth=1)
+    events = parser.feed('{"competencies": [{"title": "A"}, {"title": "B"}], "x": 1}')
+    assert events == [(("competencies",), [{"title": "A"}, {"title": "B"}]), (("x",), 1)]
+
+
+def test_apply_event_grows_lists_and_replaces_mismatched_containers():
+    target = {"professional_history": None, "awards_leadership": []}
+    apply_event(target, ("professional_history", 2), {"role": "C"})
+    apply_event(target, ("awards_leadership", "Awards"), "text")
+    assert target == {"professional_history": [None, None, {"role": "C"}], "awards_leadership": {"Awards": "text"}}